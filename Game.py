@@ -4,13 +4,25 @@
 
 import tkinter as tk
 from tkinter import simpledialog, messagebox, PhotoImage
-import os, sys, json, time, math, random, hashlib, binascii, io
+import os, sys, json, time, math, random, hashlib, hmac, binascii, io, argparse, collections, threading, atexit, heapq, weakref, inspect
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageDraw, ImageTk
 
+# Optional NumPy for the vectorized runner entity store
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except Exception:
+    np = None
+    HAVE_NUMPY = False
+
 # Optional richer sound via pygame
 USE_PYGAME = False
 try:
     import pygame
+    # 16-bit mono at the synth rate so raw sample buffers can be handed to Sound()
+    # as-is; a small buffer keeps trigger-to-speaker latency down
+    pygame.mixer.pre_init(22050, -16, 1, 512)
     pygame.mixer.init()
     USE_PYGAME = True
 except Exception:
@@ -28,89 +40,314 @@ if USE_WINSOUND:
 # Persistence
 # -------------------------
 USERS_FILE = "users.json"
+USERS_DB = "users.db"
 
-def load_users():
-    if not os.path.exists(USERS_FILE):
+def load_users(path=None):
+    path = path or USERS_FILE
+    if not os.path.exists(path):
         return {"users": {}, "current_user": None}
     try:
-        with open(USERS_FILE, "r", encoding="utf8") as f:
+        with open(path, "r", encoding="utf8") as f:
             return json.load(f)
     except Exception:
         try:
-            os.rename(USERS_FILE, USERS_FILE + ".bak")
+            os.rename(path, path + ".bak")
         except Exception:
             pass
         return {"users": {}, "current_user": None}
 
-def save_users(data):
-    with open(USERS_FILE, "w", encoding="utf8") as f:
-        json.dump(data, f, indent=2)
+def write_atomic(path, text):
+    # temp file + fsync + rename: readers see the old file or the new one, never half of one
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # per writer, so two saving at once can't share it
+    try:
+        with open(tmp, "w", encoding="utf8") as f:
+            f.write(text); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+def dump_compact(obj):
+    return json.dumps(obj, separators=(",", ":"))
+
+def save_users(data, path=None):
+    write_atomic(path or USERS_FILE, dump_compact(data))
+
+class SaveWorker:
+    """Writes users.json from a background thread.
+
+    save() runs on the Tk thread and only serialises the profiles named as dirty;
+    the writer thread coalesces everything queued within `delay` seconds into
+    one atomic write of the whole file. `latency` holds the main-thread cost of
+    each save() call.
+    """
+    def __init__(self, path=USERS_FILE, delay=0.2):
+        self.path = path; self.delay = delay
+        self.cond = threading.Condition()
+        self.users = {}  # username -> serialised profile, as last queued
+        self.current = None
+        self.dirty = False; self.busy = False; self.flushing = False
+        self.requests = 0; self.writes = 0
+        self.latency = collections.deque(maxlen=256)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="users-writer", daemon=True)
+        self.thread.start()
+    def prime(self, data):
+        # serialise everything once at startup; later saves only touch dirty profiles
+        with self.cond:
+            self.users = {name: dump_compact(p) for name, p in data.get("users", {}).items()}
+            self.current = data.get("current_user")
+    def save(self, data, dirty=()):
+        t0 = time.perf_counter()
+        snaps = [(name, dump_compact(data["users"][name])) for name in dirty if name in data["users"]]
+        with self.cond:
+            self.users.update(snaps)
+            self.current = data.get("current_user")
+            self.dirty = True; self.requests += 1
+            self.cond.notify()
+        self.latency.append(time.perf_counter() - t0)
+    def _text(self):
+        users = ",".join(json.dumps(name) + ":" + p for name, p in self.users.items())
+        return '{"users":{' + users + '},"current_user":' + json.dumps(self.current) + "}"
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.dirty: self.cond.wait()
+                # let a burst of saves (purchase + popup, run end + menu) pile up
+                end = time.monotonic() + self.delay
+                while not self.flushing and time.monotonic() < end:
+                    self.cond.wait(end - time.monotonic())
+                text = self._text(); self.dirty = False; self.busy = True
+            try:
+                write_atomic(self.path, text); self.writes += 1
+                self.error = None  # every write is a full snapshot, so this one covers the failed ones
+            except Exception as e:
+                if self.error is None: print(f"could not save {self.path}: {e}", file=sys.stderr)
+                self.error = e
+            with self.cond:
+                self.busy = False; self.cond.notify_all()
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is on disk; re-raises the last failed write."""
+        with self.cond:
+            self.flushing = True; self.cond.notify_all()
+            end = time.monotonic() + timeout
+            while (self.dirty or self.busy) and time.monotonic() < end:
+                self.cond.wait(0.05)
+            self.flushing = False
+            err, self.error = self.error, None
+        if err is not None: raise err
+    def stats(self):
+        lat = sorted(self.latency)
+        return {"requests": self.requests, "writes": self.writes,
+                "p50_ms": lat[len(lat)//2] * 1000 if lat else 0.0, "max_ms": lat[-1] * 1000 if lat else 0.0}
 
-def hash_password(password, salt=None):
+# Profile stores: get / exists / put (one user) / current_user / set_current / flush / close
+class JsonProfileStore:
+    """Every account in one users.json, held in memory and written by a SaveWorker."""
+    def __init__(self, path=USERS_FILE):
+        self.data = load_users(path)
+        if "users" not in self.data: self.data["users"] = {}
+        self.saver = SaveWorker(path); self.saver.prime(self.data)
+    def get(self, name): return self.data["users"].get(name)
+    def exists(self, name): return name in self.data["users"]
+    def put(self, name, profile):
+        self.data["users"][name] = profile
+        self.saver.save(self.data, [name])
+    def current_user(self): return self.data.get("current_user")
+    def set_current(self, name):
+        self.data["current_user"] = name
+        self.saver.save(self.data)
+    def flush(self): self.saver.flush()
+    def close(self): self.saver.flush()
+
+class SqliteProfileStore:
+    """One row per account in SQLite: primary-key lookups and single-row upserts."""
+    def __init__(self, path=USERS_DB):
+        import sqlite3
+        self.db = sqlite3.connect(path)
+        # WAL + NORMAL: a commit appends to the log without an fsync per run end
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS users (name TEXT PRIMARY KEY, profile TEXT NOT NULL)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    def get(self, name):
+        row = self.db.execute("SELECT profile FROM users WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+    def exists(self, name):
+        return self.db.execute("SELECT 1 FROM users WHERE name = ?", (name,)).fetchone() is not None
+    def put(self, name, profile):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO users (name, profile) VALUES (?, ?)", (name, dump_compact(profile)))
+    def put_many(self, items):
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO users (name, profile) VALUES (?, ?)",
+                                ((name, dump_compact(p)) for name, p in items))
+    def current_user(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'current_user'").fetchone()
+        return row[0] if row else None
+    def set_current(self, name):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('current_user', ?)", (name,))
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    def flush(self): pass  # every put() is its own transaction
+    def close(self): self.db.close()
+
+def open_profile_store(kind="json", path=None):
+    if kind == "sqlite": return SqliteProfileStore(path or USERS_DB)
+    return JsonProfileStore(path or USERS_FILE)
+
+def migrate_users(json_path, db_path):
+    """Import every account (and the signed-in user) from a users.json into a SQLite store."""
+    with open(json_path, "r", encoding="utf8") as f:
+        data = json.load(f)
+    store = SqliteProfileStore(db_path)
+    try:
+        store.put_many(data.get("users", {}).items())
+        if data.get("current_user"): store.set_current(data["current_user"])
+        return store.count()
+    finally:
+        store.close()
+
+# PBKDF2 work factor for new hashes. Each profile records its own count in
+# "pw_iter" (profiles from before that field used LEGACY_ITERATIONS); raising
+# this rehashes a user's password on their next successful login.
+PBKDF2_ITERATIONS = 150000
+LEGACY_ITERATIONS = 150000
+
+def hash_password(password, salt=None, iterations=PBKDF2_ITERATIONS):
     if salt is None:
         salt = os.urandom(16)
     else:
         salt = binascii.unhexlify(salt)
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf8"), salt, 150000)
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf8"), salt, iterations)
     return binascii.hexlify(dk).decode("ascii"), binascii.hexlify(salt).decode("ascii")
 
-def verify_password(stored_hash, stored_salt, attempt):
-    dk, _ = hash_password(attempt, salt=stored_salt)
-    return dk == stored_hash
+def verify_password(stored_hash, stored_salt, attempt, iterations=LEGACY_ITERATIONS):
+    dk, _ = hash_password(attempt, salt=stored_salt, iterations=iterations)
+    return hmac.compare_digest(dk, stored_hash)
+
+def needs_rehash(profile):
+    return profile.get("pw_iter", LEGACY_ITERATIONS) < PBKDF2_ITERATIONS
+
+class KdfWorker:
+    """Runs password hashing off the Tk thread.
+
+    pbkdf2_hmac releases the GIL, so one worker thread keeps the UI responsive.
+    Tk isn't thread-safe: callbacks are only run from poll(), which the app
+    calls every frame on the Tk thread. A hash or callback that raises goes to
+    on_error(exc) instead of out of poll() (and the app's frame loop).
+    """
+    def __init__(self, on_error=None):
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kdf")
+        self.pending = []  # (future, callback)
+        self.on_error = on_error
+    def submit(self, fn, args, callback):
+        self.pending.append((self.pool.submit(fn, *args), callback))
+    def poll(self):
+        done = [p for p in self.pending if p[0].done()]
+        if not done: return
+        self.pending = [p for p in self.pending if p not in done]
+        for fut, cb in done:
+            try:
+                cb(fut.result())
+            except Exception as e:
+                if self.on_error is None: raise
+                self.on_error(e)
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
 
 # -------------------------
 # Sound generation & helpers
 # -------------------------
-_sound_cache = {}
-def _synth_wav(path, freq=440, ms=120, vol=0.12):
-    import wave, struct
-    sr = 22050
-    n = int(sr * ms / 1000.0)
-    with wave.open(path, "wb") as wf:
-        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(sr)
-        max_a = int(32767 * vol)
-        for i in range(n):
-            t = i / sr
-            s = int(max_a * math.sin(2 * math.pi * freq * t))
-            wf.writeframes(struct.pack("<h", s))
-
-# prepare small wavs (if pygame)
-if USE_PYGAME:
-    tmp = os.path.join(os.path.dirname(__file__), "__vn_sounds2__")
-    os.makedirs(tmp, exist_ok=True)
-    try:
-        _synth_wav(os.path.join(tmp, "coin.wav"), freq=1200, ms=90)
-        _synth_wav(os.path.join(tmp, "crash.wav"), freq=120, ms=350)
-        _synth_wav(os.path.join(tmp, "engine.wav"), freq=160, ms=300)
-        _synth_wav(os.path.join(tmp, "click.wav"), freq=800, ms=60)
-        _sound_cache["coin"] = os.path.join(tmp, "coin.wav")
-        _sound_cache["crash"] = os.path.join(tmp, "crash.wav")
-        _sound_cache["engine"] = os.path.join(tmp, "engine.wav")
-        _sound_cache["click"] = os.path.join(tmp, "click.wav")
-    except Exception:
-        USE_PYGAME = False
+SOUND_RATE = 22050
+SOUND_SPECS = {"coin": (1200, 90), "crash": (120, 350), "engine": (160, 300), "click": (800, 60)}  # name -> (Hz, ms)
+SOUND_MIN_GAP = {"coin": 0.06, "click": 0.05}  # seconds; a coin burst plays once, not once per coin
+
+def synth_tone(freq, ms, vol=0.12, rate=SOUND_RATE, channels=1):
+    """Sine tone as raw native-endian signed 16-bit samples, built in one pass."""
+    n = int(rate * ms / 1000.0)
+    max_a = int(32767 * vol)
+    if HAVE_NUMPY:
+        s = (max_a * np.sin(2 * math.pi * freq / rate * np.arange(n))).astype(np.int16)
+        if channels > 1: s = np.repeat(s, channels)
+        return s.tobytes()
+    import array
+    w = 2 * math.pi * freq / rate
+    s = array.array("h", [int(max_a * math.sin(w * i)) for i in range(n)])
+    if channels > 1: s = array.array("h", [v for v in s for _ in range(channels)])
+    return s.tobytes()
+
+class SoundBank:
+    """One preloaded Sound per effect, played through a fixed pool of mixer channels.
+
+    Nothing touches the disk: tones are synthesised straight into memory in the
+    mixer's own format. play() throttles effects listed in SOUND_MIN_GAP and
+    records its own cost in `latency`.
+    """
+    def __init__(self, specs=SOUND_SPECS, channels=8, min_gap=SOUND_MIN_GAP):
+        t0 = time.perf_counter()
+        self.sounds = {}; self.pool = []; self.next_ch = 0
+        self.min_gap = dict(min_gap); self.last = {}
+        self.plays = 0; self.throttled = 0; self.latency = collections.deque(maxlen=256)
+        self.enabled = USE_PYGAME
+        if self.enabled:
+            try:
+                rate, size, nch = pygame.mixer.get_init()
+                if size not in (-16, 16): raise ValueError("mixer is not 16-bit")
+                pygame.mixer.set_num_channels(channels)
+                self.pool = [pygame.mixer.Channel(i) for i in range(channels)]
+                for name, (freq, ms) in specs.items():
+                    self.sounds[name] = pygame.mixer.Sound(buffer=synth_tone(freq, ms, rate=rate, channels=nch))
+            except Exception:
+                self.enabled = False; self.sounds = {}; self.pool = []
+        self.build_ms = (time.perf_counter() - t0) * 1000
+
+    def _channel(self):
+        # first idle channel, else steal round-robin so the oldest sound gets cut
+        for ch in self.pool:
+            if not ch.get_busy(): return ch
+        ch = self.pool[self.next_ch]; self.next_ch = (self.next_ch + 1) % len(self.pool)
+        return ch
+
+    def play(self, name):
+        t0 = time.perf_counter()
+        gap = self.min_gap.get(name)
+        if gap is not None and t0 - self.last.get(name, float("-inf")) < gap:
+            self.throttled += 1
+            return False
+        self.last[name] = t0
+        if self.enabled:
+            snd = self.sounds.get(name)
+            if snd is None: return False
+            try:
+                self._channel().play(snd)
+            except Exception:
+                pass
+        elif USE_WINSOUND:
+            try:
+                winsound.MessageBeep()
+            except Exception:
+                pass
+        self.plays += 1
+        self.latency.append(time.perf_counter() - t0)
+        return True
+
+SOUNDS = SoundBank()
 
 def play_sound(name):
-    if USE_PYGAME and name in _sound_cache:
-        try:
-            s = pygame.mixer.Sound(_sound_cache[name])
-            s.play()
-        except Exception:
-            pass
-    elif USE_WINSOUND:
-        try:
-            winsound.MessageBeep()
-        except Exception:
-            pass
-    else:
-        # no-op
-        pass
+    SOUNDS.play(name)
 
 # -------------------------
 # Game constants
 # -------------------------
-WIDTH, HEIGHT = 1000, 640
+WIDTH, HEIGHT = 1000, 640  # logical resolution: the canvas is drawn in these pixels, then scaled to the window
+SCALE_STEP = 0.25  # window scale factors are rounded down to a multiple of this
 FPS = 60
+TICK = 1.0 / FPS       # fixed simulation step
+MAX_FRAME_DT = 0.25    # longest wall-clock gap we try to catch up on (window drag, breakpoint...)
 FONT = ("Consolas", 13)
 LANES = 3
 
@@ -235,40 +472,402 @@ def generate_coin_frames(frames=8):
         out.append(im)
     return out
 
-# Generate everything and convert to Tk
-ALEX_PIL = generate_alex_frames((120,120,120), frames=6)
-WORKER_PIL = generate_worker_frames((30,100,200), frames=4)
-VAN_PIL = generate_van_frames((10,70,150), frames=3)
-CONE_PIL = generate_cone()
-CRATE_PIL = generate_crate()
-COIN_PIL = generate_coin_frames(8)
+# static layers: drawn once in PIL and shown as single canvas images
+ROAD_DASH = (6, 8)  # lane separator dash on / off, px
+
+def road_layer():
+    """Runner road with its lane separators, one dash period taller than the screen:
+    shifting the image by the scroll offset (mod the period) scrolls the markings."""
+    on, off = ROAD_DASH; period = on + off
+    w = ROAD_W + 17; h = HEIGHT + period
+    im = Image.new("RGB", (w, h), (51,51,51))
+    d = ImageDraw.Draw(im)
+    d.line([0, 0, 0, h], fill=(0,0,0)); d.line([w - 1, 0, w - 1, h], fill=(0,0,0))
+    for i in range(LANES + 1):
+        x = 8 + round(ROAD_W / LANES * i)
+        for y in range(0, h, period): d.line([x, y, x, y + on - 1], fill=(34,34,34))
+    return im
+
+_rings = {}
+def ring_sprite(r):
+    """Detection ring of radius r: faint fill and a translucent edge (RGBA, cached per radius)."""
+    r = int(r); im = _rings.get(r)
+    if im is None:
+        im = Image.new("RGBA", (2*r + 1, 2*r + 1), (0,0,0,0))
+        ImageDraw.Draw(im).ellipse([0, 0, 2*r, 2*r], fill=(102,34,34,24), outline=(102,34,34,150))
+        _rings[r] = im
+    return im
+
+# top-down ground: one small image per tile kind, pasted into the cached world background
+GROUND_TILE = 64
+_ground = {}
+def ground_tile(kind):
+    im = _ground.get(kind)
+    if im is not None: return im
+    base = {"asphalt": (44,51,56), "bay": (44,51,56), "aisle": (38,44,48), "kerb": (34,34,34), "planter": (52,74,40)}[kind]
+    im = Image.new("RGB", (GROUND_TILE, GROUND_TILE), base)
+    d = ImageDraw.Draw(im)
+    rng = random.Random(kind)  # fixed speckle per kind
+    for _ in range(18):
+        x = rng.randrange(GROUND_TILE); y = rng.randrange(GROUND_TILE); g = rng.randint(-8, 8)
+        d.point((x, y), fill=tuple(max(0, min(255, v + g)) for v in base))
+    if kind == "bay":
+        d.rectangle([0, 4, 2, GROUND_TILE - 5], fill=(200,200,200))
+    elif kind == "aisle":
+        for x in range(4, GROUND_TILE, 24): d.rectangle([x, 30, x + 11, 33], fill=(200,170,60))
+    elif kind == "planter":
+        d.rectangle([0, 0, GROUND_TILE - 1, GROUND_TILE - 1], outline=(120,120,110), width=3)
+        for cx, cy in ((20, 18), (44, 30), (22, 46)): d.ellipse([cx - 12, cy - 12, cx + 12, cy + 12], fill=(40,110,50))
+    _ground[kind] = im
+    return im
+
+# -------------------------
+# Sprite sheet cache
+# -------------------------
+# Sprites are generated on first use and packed into one PNG sheet (one row per
+# sprite) under SPRITE_CACHE_DIR; later launches just load that file. The cache
+# key covers each generator's source, so editing one rebuilds the sheet; bump
+# SPRITE_VERSION when a shared helper they call (new_canvas...) changes.
+SPRITE_VERSION = 1
+SPRITE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__sprite_cache__")
+SPRITE_SPECS = [
+    ("alex", generate_alex_frames, {"base_color": (120,120,120), "frames": 6}),
+    ("worker", generate_worker_frames, {"color": (30,100,200), "frames": 4}),
+    ("van", generate_van_frames, {"vcolor": (10,70,150), "frames": 3}),
+    ("cone", generate_cone, {}),
+    ("crate", generate_crate, {}),
+    ("coin", generate_coin_frames, {"frames": 8}),
+]
+_sprites = {}  # name -> list of PIL frames, filled by load_sprites()
+
+def _source(fn):
+    try:
+        return inspect.getsource(fn)
+    except (OSError, TypeError):
+        return fn.__name__  # no source shipped (frozen build): fall back to SPRITE_VERSION bumps
+
+def sprite_cache_key():
+    blob = json.dumps([SPRITE_VERSION, SPR] + [[n, _source(fn), kw] for n, fn, kw in SPRITE_SPECS], sort_keys=True)
+    return hashlib.sha1(blob.encode("utf8")).hexdigest()[:16]
+
+def sprite_sheet_path(cache_dir=None):
+    return os.path.join(cache_dir or SPRITE_CACHE_DIR, f"sprites_{sprite_cache_key()}.png")
+
+def _read_sheet(path):
+    sheet = Image.open(path, formats=["PNG"]); sheet.load()
+    layout = json.loads(sheet.text["layout"])
+    if [n for n, _, _ in SPRITE_SPECS] != list(layout): raise ValueError("sheet layout mismatch")
+    out = {}
+    for row, (name, count) in enumerate(layout.items()):
+        out[name] = [sheet.crop((i*SPR, row*SPR, (i+1)*SPR, (row+1)*SPR)) for i in range(count)]
+    return out
+
+def _write_sheet(path, sprites):
+    from PIL import PngImagePlugin
+    cols = max(len(fr) for fr in sprites.values())
+    sheet = Image.new("RGBA", (cols*SPR, len(sprites)*SPR), (0,0,0,0))
+    for row, frames in enumerate(sprites.values()):
+        for i, im in enumerate(frames): sheet.paste(im, (i*SPR, row*SPR))
+    info = PngImagePlugin.PngInfo()
+    info.add_text("layout", json.dumps({n: len(fr) for n, fr in sprites.items()}))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"  # per process: balance.py workers may all build a cold cache at once
+    sheet.save(tmp, format="PNG", pnginfo=info); os.replace(tmp, path)
+
+def load_sprites(cache_dir=None):
+    """Return all sprite frames, generating (and caching to disk) on first call."""
+    if _sprites: return _sprites
+    path = sprite_sheet_path(cache_dir)
+    try:
+        _sprites.update(_read_sheet(path))
+        return _sprites
+    except Exception:
+        pass  # missing, stale or unreadable sheet: regenerate
+    for name, fn, kw in SPRITE_SPECS:
+        out = fn(**kw)
+        _sprites[name] = out if isinstance(out, list) else [out]
+    try:
+        _write_sheet(path, _sprites)
+    except Exception:
+        pass  # read-only install: keep the in-memory frames
+    return _sprites
+
+# frame counts per sprite, known without generating anything (used by headless code)
+SPRITE_FRAMES = {n: kw.get("frames", 1) for n, _, kw in SPRITE_SPECS}
+
+def sprite(name):
+    return load_sprites()[name]
+
+# -------------------------
+# Animation
+# -------------------------
+# Clips are defined once over the generated frame lists. Nothing animates per
+# entity: whoever shows a clip reads its frame off a shared clock (the
+# Simulation's game time), so every coin on the road spins in step.
+class Clip:
+    """A sprite's frames (indices into its frame list) played at `fps`; mode is "loop", "pingpong" or "once"."""
+    __slots__ = ("frames", "fps", "mode")
+    def __init__(self, name, fps, mode="loop", frames=None):
+        order = list(frames) if frames is not None else list(range(SPRITE_FRAMES[name]))
+        if mode == "pingpong": order += order[-2:0:-1]
+        self.frames = tuple(order); self.fps = fps; self.mode = mode
+    def frame(self, t):
+        # frame index at clock time t ("once" clips want the time since they started)
+        i = int(t * self.fps + 1e-6); n = len(self.frames)
+        return self.frames[min(i, n - 1) if self.mode == "once" else i % n]
+
+# one clip per sprite kind; rates are the old per-entity ones in 60 Hz ticks per frame
+CLIPS = {
+    "alex": Clip("alex", 60 / 8),
+    "worker": Clip("worker", 60 / 9),
+    "van": Clip("van", 60 / 8),
+    "coin": Clip("coin", 60 / 5),
+}
+
+_bounds = {}  # name -> opaque box over all frames
+
+def sprite_bounds(name):
+    """(x0, y0, x1, y1) of the non-transparent pixels of any frame: hitboxes are cut from this."""
+    b = _bounds.get(name)
+    if b is None:
+        boxes = [im.getchannel("A").getbbox() for im in sprite(name)]
+        boxes = [bb for bb in boxes if bb] or [(0, 0, SPR, SPR)]
+        b = _bounds[name] = (min(bb[0] for bb in boxes), min(bb[1] for bb in boxes),
+                             max(bb[2] for bb in boxes), max(bb[3] for bb in boxes))
+    return b
+
+_tk_sources = weakref.WeakKeyDictionary()  # PhotoImage -> the PIL image it was made from, for rescaling
 
 def pil_to_tk(img):
-    return ImageTk.PhotoImage(img)
+    tk_img = ImageTk.PhotoImage(img)
+    _tk_sources[tk_img] = img
+    return tk_img
+
+# -------------------------
+# Cosmetic skin cache
+# -------------------------
+# sprite kind -> (cosmetics, base sprite name, region painted with the cosmetic colour)
+SKIN_KINDS = {
+    "alex": (ALEX_COS, "alex", [18,24,46,46]),
+    "van": (VAN_COS, "van", [6,20,58,44]),
+}
+
+class SkinCache:
+    """Tinted PhotoImages keyed by (sprite kind, cosmetic id, frame index).
+
+    Built once when a skin gets equipped (login / purchase) so drawing is a dict lookup.
+    """
+    def __init__(self, plain):
+        self.plain = plain  # kind -> untinted Tk frames
+        self.frames = {}
+    def equip(self, equipped):
+        want = set()
+        for kind, (cos, base, region) in SKIN_KINDS.items():
+            cid = equipped.get(kind)
+            color = next((it.get("color") for it in cos if it["id"] == cid), None)
+            if not color: continue
+            want.add((kind, cid))
+            if (kind, cid, 0) in self.frames: continue
+            for i, frame in enumerate(sprite(base)):
+                tmp = frame.copy()
+                ImageDraw.Draw(tmp).rectangle(region, fill=tuple(color)+(255,))
+                self.frames[(kind, cid, i)] = pil_to_tk(tmp)
+        # drop skins nobody is wearing any more
+        for key in [k for k in self.frames if k[:2] not in want]:
+            del self.frames[key]
+    def get(self, kind, cid, i):
+        img = self.frames.get((kind, cid, i))
+        return img if img is not None else self.plain[kind][i]
+
+# -------------------------
+# Scaled canvas
+# -------------------------
+def fit_scale(w, h):
+    # largest SCALE_STEP multiple at which the logical screen fits a w x h window
+    return max(SCALE_STEP, math.floor(min(w / WIDTH, h / HEIGHT) / SCALE_STEP) * SCALE_STEP)
+
+class ScaledCanvas(tk.Canvas):
+    """A canvas drawn in logical WIDTH x HEIGHT pixels and shown `zoom` times larger.
+
+    Coordinates, scroll regions and font sizes are multiplied on the way to Tk.
+    Images made by pil_to_tk() are swapped for nearest-neighbour copies, each
+    resized once per scale and then reused. At scale 1 calls go straight through.
+    """
+    def __init__(self, master, scale=1.0, **kw):
+        super().__init__(master, width=round(WIDTH * scale), height=round(HEIGHT * scale), **kw)
+        self.zoom = scale; self.scaled = weakref.WeakKeyDictionary()  # PhotoImage -> copy at self.zoom
+    def set_scale(self, scale):
+        if scale == self.zoom: return False
+        self.zoom = scale; self.scaled = weakref.WeakKeyDictionary()
+        super().configure(width=round(WIDTH * scale), height=round(HEIGHT * scale))
+        return True
+    def image(self, img):
+        out = self.scaled.get(img)
+        if out is None:
+            src = _tk_sources.get(img)
+            if src is None: return img  # not ours to resize
+            s = self.zoom
+            out = self.scaled[img] = ImageTk.PhotoImage(
+                src.resize((max(1, round(src.width * s)), max(1, round(src.height * s))), Image.NEAREST))
+        return out
+    def prescale(self, images):
+        # resize a batch up front so the first frame after a resize doesn't do it
+        if self.zoom != 1:
+            for img in images: self.image(img)
+    def _opts(self, kw):
+        s = self.zoom
+        if "image" in kw: kw["image"] = self.image(kw["image"])
+        f = kw.get("font")
+        if isinstance(f, tuple): kw["font"] = (f[0], max(1, round(f[1] * s))) + f[2:]
+        return kw
+    def _create(self, kind, args, kw):
+        if self.zoom == 1: return getattr(super(), "create_" + kind)(*args, **kw)
+        s = self.zoom
+        return getattr(super(), "create_" + kind)(*[a * s for a in args], **self._opts(kw))
+    def create_image(self, *args, **kw): return self._create("image", args, kw)
+    def create_text(self, *args, **kw): return self._create("text", args, kw)
+    def create_line(self, *args, **kw): return self._create("line", args, kw)
+    def create_rectangle(self, *args, **kw): return self._create("rectangle", args, kw)
+    def create_oval(self, *args, **kw): return self._create("oval", args, kw)
+    def coords(self, item, *args):
+        if self.zoom == 1 or not args: return super().coords(item, *args)
+        s = self.zoom
+        return super().coords(item, *[a * s for a in args])
+    def move(self, tag, dx, dy):
+        s = self.zoom
+        return super().move(tag, dx * s, dy * s)
+    def itemconfigure(self, item, cnf=None, **kw):
+        if self.zoom == 1: return super().itemconfigure(item, cnf, **kw)
+        return super().itemconfigure(item, cnf, **self._opts(kw))
+    itemconfig = itemconfigure
+    def configure(self, cnf=None, **kw):
+        if "scrollregion" in kw: kw["scrollregion"] = tuple(v * self.zoom for v in kw["scrollregion"])
+        return super().configure(cnf, **kw)
+    config = configure
+
+# -------------------------
+# Retained canvas items
+# -------------------------
+HUD_RATE = 10  # HUD text refreshes per second (0 = every frame)
+
+class TkCallCounter:
+    """Stands in for a widget's Tcl interpreter handle and counts the commands sent through it."""
+    def __init__(self, tkapp):
+        self._tk = tkapp; self.calls = 0; self.last = 0
+    def call(self, *args):
+        self.calls += 1
+        return self._tk.call(*args)
+    def __getattr__(self, name):
+        return getattr(self._tk, name)
+    def take(self):
+        # calls since the previous take(), i.e. one frame's worth
+        self.last = self.calls; self.calls = 0
+        return self.last
+
+class Hud:
+    """Persistent HUD text items, one per name.
+
+    set() creates the item once, then calls itemconfig only when the shown value
+    changed and the frame is one of the `rate` per second opened by frame().
+    `origin` is the camera offset for newly created items (the camera moves the
+    "hud" tag after that).
+    """
+    def __init__(self, canvas, rate=HUD_RATE):
+        self.canvas = canvas; self.rate = rate
+        self.origin = (0, 0)
+        self.due = 0.0; self.open = True
+        self.reset()
+    def reset(self):
+        self.items = {}  # name -> [canvas id, shown value]; after canvas.delete("all")
+    def frame(self, now):
+        self.open = now >= self.due
+        if self.open and self.rate: self.due = max(self.due + 1.0 / self.rate, now)
+    def set(self, name, x, y, label, value=None, anchor="nw", fill="#fff"):
+        ent = self.items.get(name)
+        if ent is None:
+            text = label if value is None else f"{label}{value}"
+            item = self.canvas.create_text(x + self.origin[0], y + self.origin[1], anchor=anchor, text=text,
+                                           font=FONT, fill=fill, tags="hud")
+            self.items[name] = [item, value]
+        elif self.open and ent[1] != value:
+            self.canvas.itemconfig(ent[0], text=f"{label}{value}"); ent[1] = value
+
+class SpriteItem:
+    """One canvas image item, created on first use and then only moved/retextured."""
+    def __init__(self):
+        self.item = None; self.img = None; self.pos = None
+    def place(self, c, x, y, img, layer=None):
+        pos = (int(x), int(y))
+        if self.item is None:
+            self.item = c.create_image(pos[0], pos[1], image=img, anchor="nw")
+            # new items go on top of the stack; push them under the next layer marker
+            if layer: c.tag_lower(self.item, layer)
+        else:
+            if pos != self.pos: c.coords(self.item, pos[0], pos[1])
+            if img is not self.img: c.itemconfig(self.item, image=img)
+        self.img = img; self.pos = pos
+    def delete(self, c):
+        if self.item is not None: c.delete(self.item)
+        self.item = None; self.img = None; self.pos = None
+
+BG_TILE = 512       # px per cached top-down background image
+CULL_MARGIN = 128   # px around the viewport that still gets canvas items (>= detection ring radius)
+
+class WorldBackground:
+    """Static ground for one top-down map.
 
-# single conversion after Tk root created (we'll do in app init)
-# store PIL base as globals for tinting
-ALEX_BASE = ALEX_PIL
-WORKER_BASE = WORKER_PIL
-VAN_BASE = VAN_PIL
-CONE_BASE = CONE_PIL
-CRATE_BASE = CRATE_PIL
-COIN_BASE = COIN_PIL
+    build() pastes the ground tiles into BG_TILE-square images up front (kept
+    for later runs) and has the canvas scale them, so scrolling never renders;
+    only the images overlapping the viewport have canvas items.
+    """
+    def __init__(self, name):
+        self.tiles = map_tiles(name); self.size = MAPS[name]["size"]
+        self.images = {}  # (col, row) -> PhotoImage, filled by build()
+        self.reset()
+    def reset(self):
+        self.items = {}; self.span = None  # after canvas.delete("all")
+    def build(self, canvas):
+        # every image of the map, then its copies at the canvas's current scale
+        if not self.images:
+            gt = GROUND_TILE; W, H = self.size
+            for bx in range(0, W, BG_TILE):
+                for by in range(0, H, BG_TILE):
+                    w = min(BG_TILE, W - bx); h = min(BG_TILE, H - by)
+                    im = Image.new("RGB", (w, h))
+                    for r in range(by // gt, -(-(by + h) // gt)):
+                        for c in range(bx // gt, -(-(bx + w) // gt)):
+                            im.paste(ground_tile(self.tiles[r][c]), (c * gt - bx, r * gt - by))
+                    self.images[(bx // BG_TILE, by // BG_TILE)] = pil_to_tk(im)
+        canvas.prescale(self.images.values())
+    def show(self, c, x0, y0, x1, y1):
+        W, H = self.size
+        span = (max(0, int(x0 // BG_TILE)), min(-(-W // BG_TILE), int(x1 // BG_TILE) + 1),
+                max(0, int(y0 // BG_TILE)), min(-(-H // BG_TILE), int(y1 // BG_TILE) + 1))
+        if span == self.span: return
+        self.span = span
+        want = {(i, j) for i in range(span[0], span[1]) for j in range(span[2], span[3])}
+        for key in [k for k in self.items if k not in want]: c.delete(self.items.pop(key))
+        for key in want:
+            if key not in self.items:
+                self.items[key] = item = c.create_image(key[0] * BG_TILE, key[1] * BG_TILE, image=self.images[key], anchor="nw")
+                c.tag_lower(item)  # beneath everything else
 
 # -------------------------
 # Entities
 # -------------------------
+# Entities are plain game state. Simulation gives each one an `eid`; frontends key
+# their canvas items on it.
 class TopPlayer:
-    def __init__(self, tkassets, profile):
-        self.x = 80; self.y = HEIGHT//2 - 30
+    def __init__(self, profile, world=(WIDTH, HEIGHT), nav=None):
+        self.world = world; self.nav = nav  # NavGrid when the map has obstacles
+        self.x = 80; self.y = world[1]//2 - 30
+        self.px = self.x; self.py = self.y  # position at the previous tick, for interpolation
         self.speed = 2.0
         self.stamina = 100
         self.score = 0.0
-        self.coins_collected = 0
         self.detect_radius = 110
-        self.anim_i = 0; self.anim_t = 0.0
-        self.tk = tkassets
         self.profile = profile
+        self.eid = None
         self.apply_profile()
     def apply_profile(self):
         self.speed = 2.0
@@ -279,6 +878,7 @@ class TopPlayer:
             if it == "mask": self.detect_radius *= 0.8
             if it == "wallet2": self.score_mult = 2.0
     def update(self, dt, keys):
+        self.px = self.x; self.py = self.y
         sx = 0; sy = 0
         if keys.get("left"): sx -=1
         if keys.get("right"): sx +=1
@@ -292,206 +892,993 @@ class TopPlayer:
         else:
             self.stamina = min(100, self.stamina + 12*dt)
         if sx !=0 and sy !=0: spd *= 0.7071
-        self.x = clamp(self.x + sx * spd * dt * 60, 0, WIDTH-64)
-        self.y = clamp(self.y + sy * spd * dt * 60, 0, HEIGHT-80)
+        x = clamp(self.x + sx * spd * dt * 60, 0, self.world[0]-64)
+        y = clamp(self.y + sy * spd * dt * 60, 0, self.world[1]-80)
+        if self.nav: x, y = self.nav.slide(self.x, self.y, x, y)
+        self.x = x; self.y = y
         self.score += dt * 6 * self.score_mult
-        self.anim_t += dt
-        if self.anim_t > 0.12:
-            self.anim_t = 0
-            self.anim_i = (self.anim_i + 1) % len(self.tk['alex_frames'])
-    def draw(self, c):
-        # apply cosmetic tint if needed
-        equip = self.profile.get("equipped", {}).get("alex", "alex_grey")
-        color = None
-        for it in ALEX_COS:
-            if it['id'] == equip:
-                color = it.get("color")
-        frame = ALEX_BASE[self.anim_i]
-        if color:
-            tmp = frame.copy()
-            draw = ImageDraw.Draw(tmp)
-            draw.rectangle([18,24,46,46], fill=tuple(color)+(255,))
-            imgtk = pil_to_tk(tmp); c.create_image(int(self.x), int(self.y), image=imgtk, anchor="nw")
-            c.image_cache.append(imgtk)
-        else:
-            c.create_image(int(self.x), int(self.y), image=self.tk['alex_frames'][self.anim_i], anchor="nw")
 
 class TopWorker:
-    def __init__(self, x, y, tkassets):
-        self.x=x; self.y=y; self.tk=tkassets
-        self.path = self._gen()
-        self.pidx=0; self.chasing=False
-        self.speed=1.0; self.anim_i=0; self.anim_t=0.0
-    def _gen(self):
+    def __init__(self, x, y, rng, world=(WIDTH, HEIGHT), nav=None):
+        self.nav = nav  # NavGrid when the map has obstacles
+        if nav: x, y = nav.snap(x, y)
+        self.x=x; self.y=y; self.px=x; self.py=y; self.rng=rng
+        self.cycle = self._gen(world)
+        self.route_from(x, y)
+        self.chasing=False
+        self.speed=1.0
+        self.cell = None  # SpatialGrid bucket key
+        self.eid = None
+    def _gen(self, world):
         pts=[]
         cx,cy = self.x, self.y
         for _ in range(4):
-            pts.append((clamp(cx + random.randint(-120,120), 100, WIDTH-160),
-                        clamp(cy + random.randint(-80,80), 60, HEIGHT-120)))
-        return pts
-    def update(self, dt, player):
-        dx = player.x - self.x; dy = player.y - self.y
-        dist = math.hypot(dx,dy)
-        if dist <= player.detect_radius and random.random() < 0.95:
-            self.chasing = True
+            pts.append((clamp(cx + self.rng.randint(-120,120), 100, world[0]-160),
+                        clamp(cy + self.rng.randint(-80,80), 60, world[1]-120)))
+        nav = self.nav
+        if not nav: return pts
+        # walk the patrol as cached grid paths between the (snapped) points
+        pts = [nav.snap(x, y) for x, y in pts]; out = []
+        for a, b in zip(pts, pts[1:] + pts[:1]): out += nav.waypoints(a[0], a[1], b[0], b[1])
+        return out
+    def route_from(self, x, y):
+        # path = the way to the patrol's first point, then the patrol loop from index `loop`
+        if self.nav:
+            lead = self.nav.waypoints(x, y, *self.cycle[-1])
+            self.path = lead + self.cycle; self.loop = len(lead)
+        else:
+            self.path = self.cycle; self.loop = 0
+        self.pidx = 0
+    def move(self, x, y):
+        if self.nav: x, y = self.nav.slide(self.x, self.y, x, y)
+        self.x = x; self.y = y
+    def update(self, dt, player, flow=None):
+        # spotting the player is decided by Simulation from its spatial grid query
+        self.px = self.x; self.py = self.y
         if self.chasing:
-            ang = math.atan2(player.y - self.y, player.x - self.x)
-            self.x += math.cos(ang) * self.speed * 1.3 * dt * 60
-            self.y += math.sin(ang) * self.speed * 1.3 * dt * 60
+            # straight at the player, or along the shared flow field when a wall is in the way
+            tx, ty = (player.x, player.y) if flow is None else flow.target(self.x, self.y, player.x, player.y)
+            dx = tx - self.x; dy = ty - self.y
+            dist = math.hypot(dx,dy)
+            if dist > 0:
+                step = self.speed * 1.3 * dt * 60 / dist
+                self.move(self.x + dx * step, self.y + dy * step)
+            if flow is not None: dist = math.hypot(player.x - self.x, player.y - self.y)
             if dist > 420:
-                self.chasing = False; self.pidx=0
+                self.chasing = False; self.route_from(self.x, self.y)
         else:
             if not self.path: return
             tx,ty = self.path[self.pidx]
             dx = tx - self.x; dy = ty - self.y; d=math.hypot(dx,dy)
-            if d < 6: self.pidx=(self.pidx+1)%len(self.path)
+            if d < 6:
+                self.pidx += 1
+                if self.pidx == len(self.path): self.pidx = self.loop
             else:
-                ang = math.atan2(dy,dx)
-                self.x += math.cos(ang) * self.speed * dt * 60
-                self.y += math.sin(ang) * self.speed * dt * 60
-        self.anim_t += dt
-        if self.anim_t > 0.14:
-            self.anim_t = 0; self.anim_i = (self.anim_i + 1) % len(self.tk['worker_frames'])
-    def draw(self, c):
-        c.create_image(int(self.x), int(self.y), image=self.tk['worker_frames'][self.anim_i], anchor="nw")
+                step = self.speed * dt * 60 / d
+                self.move(self.x + dx * step, self.y + dy * step)
 
 class VanTop:
-    def __init__(self, x, y, tkassets, profile):
-        self.x=x; self.y=y; self.tk=tkassets; self.profile=profile
-        self.anim_i=0; self.anim_t=0.0; self.stolen=False
-    def update(self, dt):
-        self.anim_t += dt
-        if self.anim_t > 0.12:
-            self.anim_t = 0; self.anim_i = (self.anim_i + 1) % len(self.tk['van_frames'])
-    def draw(self, c):
-        equip = self.profile.get("equipped",{}).get("van", "van_blue")
-        color = None
-        for it in VAN_COS:
-            if it['id'] == equip:
-                color = it.get("color")
-        frame = VAN_BASE[self.anim_i]
-        if color:
-            tmp = frame.copy(); draw=ImageDraw.Draw(tmp)
-            draw.rectangle([6, 20, 58, 44], fill=tuple(color)+(255,))
-            imgtk = pil_to_tk(tmp); c.create_image(int(self.x), int(self.y), image=imgtk, anchor="nw"); c.image_cache.append(imgtk)
-        else:
-            c.create_image(int(self.x), int(self.y), image=self.tk['van_frames'][self.anim_i], anchor="nw")
+    def __init__(self, x, y):
+        self.x=x; self.y=y; self.px=x; self.py=y
+        self.stolen=False
+        self.cell = None
+        self.eid = None
 
 # Runner entities
+RUNNER_KINDS = ["worker", "cone", "crate", "coin"]  # kind <-> small int code for the array store
+SPAWN_KINDS = ["worker"]*6 + ["cone"]*3 + ["crate"]*2  # weighted obstacle draw
+_runner_bounds = {}
+
+def runner_bounds():
+    """kind -> (ox, oy, w, h): the hitbox is the opaque box of the kind's sprite,
+    drawn (ox, oy) up and left of the entity's (x, y). Loads the sprites on first call."""
+    if not _runner_bounds:
+        for k in ["van"] + RUNNER_KINDS:
+            x0, y0, x1, y1 = sprite_bounds(k)
+            _runner_bounds[k] = (x0, y0, x1 - x0, y1 - y0)
+    return _runner_bounds
+
 class RunnerVan:
-    def __init__(self, tkassets, profile):
-        self.tk = tkassets; self.profile = profile
+    __slots__ = ("lane", "target", "width", "height", "x", "y", "px", "py", "eid")
+    def __init__(self):
         self.lane = LANES//2; self.target = self.lane
-        self.width = 120; self.height = 84
-        self.x=0; self.y=0; self.anim_i=0; self.anim_t=0.0
+        self.width, self.height = runner_bounds()["van"][2:]
+        self.x=0; self.y=0; self.px=0; self.py=0
+        self.eid = None
     def set_position(self, lane_x, base_y):
+        self.px = self.x; self.py = self.y
         self.x = lane_x - self.width//2; self.y = base_y - self.height//2
-    def update(self, dt):
-        self.anim_t += dt
-        if self.anim_t > 0.12:
-            self.anim_t = 0; self.anim_i = (self.anim_i + 1) % len(self.tk['van_frames'])
-    def draw(self, c, lane_x, base_y):
-        self.set_position(lane_x, base_y)
-        equip = self.profile.get("equipped",{}).get("van","van_blue")
-        color=None
-        for it in VAN_COS:
-            if it['id']==equip: color=it['color']
-        frame = VAN_BASE[self.anim_i]
-        if color:
-            tmp = frame.copy(); draw = ImageDraw.Draw(tmp)
-            draw.rectangle([6, 20, 58, 44], fill=tuple(color)+(255,))
-            imgtk = pil_to_tk(tmp); c.create_image(int(self.x), int(self.y), image=imgtk, anchor="nw"); c.image_cache.append(imgtk)
-        else:
-            c.create_image(int(self.x), int(self.y), image=self.tk['van_frames'][self.anim_i], anchor="nw")
+    def bbox(self): return (self.x, self.y, self.x+self.width, self.y+self.height)
 
+# Runner obstacles and coins are recycled through RunnerList's free list, so
+# reset() (re)initialises every slot and __init__ only calls it.
 class RunnerObstacle:
-    def __init__(self, lane, kind, tkassets):
-        self.lane=lane; self.kind=kind; self.tk=tkassets
-        sizes={"worker":(48,48),"cone":(36,36),"crate":(42,42)}
-        self.w,self.h = sizes.get(kind,(44,44))
-        self.x=0; self.y=-200
+    __slots__ = ("lane", "kind", "w", "h", "x", "y", "px", "py", "eid")
+    def __init__(self, lane, kind):
+        self.reset(lane, kind)
+    def reset(self, lane, kind):
+        self.lane=lane; self.kind=kind
+        self.w,self.h = runner_bounds()[kind][2:]
+        self.x=0; self.y=-200; self.px=0; self.py=-200
+        self.eid = None
     def set_lane_x(self, lane_x):
-        self.x = lane_x - self.w//2
+        self.x = self.px = lane_x - self.w//2
     def update(self, dt, speed):
+        self.py = self.y
         self.y += speed * dt
-    def draw(self, c):
-        if self.kind=="worker":
-            c.create_image(int(self.x), int(self.y), image=self.tk['worker_frames'][0], anchor="nw")
-        elif self.kind=="cone":
-            c.create_image(int(self.x), int(self.y), image=self.tk['cone'], anchor="nw")
-        else:
-            c.create_image(int(self.x), int(self.y), image=self.tk['crate'], anchor="nw")
     def bbox(self): return (self.x, self.y, self.x+self.w, self.y+self.h)
+    def hits(self, box):
+        # swept AABB: the box covers this tick's whole fall from py to y, so no
+        # speed or tick length can carry an entity through `box` unseen
+        ax1, ay1, ax2, ay2 = box
+        return not (ax2 < self.x or ax1 > self.x+self.w or ay2 < self.py or ay1 > self.y+self.h)
 
 class Coin:
-    def __init__(self, lane, tkassets):
-        self.lane = lane; self.tk = tkassets
-        self.w = 28; self.h = 28
-        self.x=0; self.y = -120
-        self.anim_i=0; self.anim_t=0.0
+    __slots__ = ("lane", "kind", "w", "h", "x", "y", "px", "py", "eid")
+    def __init__(self, lane, kind="coin"):
+        self.reset(lane, kind)
+    def reset(self, lane, kind="coin"):
+        self.lane = lane; self.kind = kind
+        self.w, self.h = runner_bounds()["coin"][2:]
+        self.x=0; self.y = -120; self.px=0; self.py=-120
+        self.eid = None
     def set_lane_x(self, lane_x):
-        self.x = lane_x - self.w//2
-    def update(self, dt, speed):
-        self.y += speed * dt
-        self.anim_t += dt
-        if self.anim_t > 0.08:
-            self.anim_t = 0; self.anim_i = (self.anim_i + 1) % len(self.tk['coin_frames'])
-    def draw(self, c):
-        c.create_image(int(self.x), int(self.y), image=self.tk['coin_frames'][self.anim_i], anchor="nw")
+        self.x = self.px = lane_x - self.w//2
+    update = RunnerObstacle.update
     def bbox(self): return (self.x, self.y, self.x+self.w, self.y+self.h)
+    hits = RunnerObstacle.hits
 
 # -------------------------
 # Utility
 # -------------------------
 def clamp(v,a,b): return max(a,min(b,v))
-def rects_overlap(a,b):
-    ax1,ay1,ax2,ay2 = a; bx1,by1,bx2,by2 = b
-    return not (ax2 < bx1 or ax1 > bx2 or ay2 < by1 or ay1 > by2)
+
+class SpatialGrid:
+    """Uniform-grid spatial hash over entity positions.
+
+    update() is incremental: an entity (which keeps its bucket key in `.cell`)
+    only moves buckets when it crosses a cell border.
+    """
+    def __init__(self, cell=128):
+        self.cell = cell
+        self.cells = {}
+    def update(self, ents):
+        cells = self.cells; cs = self.cell
+        for e in ents:
+            key = (int(e.x // cs), int(e.y // cs))
+            if key == e.cell: continue
+            if e.cell is not None: cells[e.cell].remove(e)
+            bucket = cells.get(key)
+            if bucket is None: cells[key] = bucket = []
+            bucket.append(e); e.cell = key
+    def within(self, x, y, r):
+        """[(entity, distance)] for every entity within r of (x, y)."""
+        cs = self.cell; r2 = r * r; out = []
+        cx0 = int((x - r) // cs); cx1 = int((x + r) // cs)
+        cy0 = int((y - r) // cs); cy1 = int((y + r) // cs)
+        cells = self.cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if not bucket: continue
+                for e in bucket:
+                    dx = e.x - x; dy = e.y - y; d2 = dx*dx + dy*dy
+                    if d2 <= r2: out.append((e, math.sqrt(d2)))
+        return out
+    def in_rect(self, x0, y0, x1, y1):
+        """Entities bucketed in the cells that overlap the rectangle (cell-coarse superset)."""
+        cs = self.cell; cells = self.cells; out = []
+        for cx in range(int(x0 // cs), int(x1 // cs) + 1):
+            for cy in range(int(y0 // cs), int(y1 // cs) + 1):
+                bucket = cells.get((cx, cy))
+                if bucket: out.extend(bucket)
+        return out
+
+# -------------------------
+# Runner entity stores
+# -------------------------
+# Both stores expose the same small API to Simulation: spawn / advance / first_hit /
+# collect / blocked / len / iteration (for drawing and bots). Removed entities are
+# reported through on_despawn(eid). Hit tests take the van's lane as a broadphase
+# (entities never leave their lane) and are swept over the last advance().
+# Spawns must come in at or above everything already in their lane, as the road does.
+class RunnerList:
+    """Runner obstacles or coins as entity objects, one deque per lane (the default store).
+
+    A lane scrolls as one, so each deque stays ordered by y: spawns are appended
+    at the top (right end), culling pops from the bottom (left end), and lane
+    queries walk in from the bottom only as far as the rows they ask about. The
+    walk stops once an entry's top is more than `max_h` (the tallest entity
+    spawned) above the range, as nothing further up can reach down into it.
+    Despawned objects go on a free list and are reset() for the next spawn, so a
+    run in steady state allocates no entities.
+    """
+    def __init__(self, cls, on_despawn):
+        self.cls = cls; self.on_despawn = on_despawn
+        self.lanes = [collections.deque() for _ in range(LANES)]
+        self.n = 0; self.max_h = 0
+        self.free = []
+        self.created = 0  # objects ever constructed; flat once the pool is warm
+    def __len__(self): return self.n
+    def __iter__(self):
+        for q in self.lanes: yield from q
+    def spawn(self, eid, lane, kind, lane_x, y, py=None):
+        if self.free:
+            ent = self.free.pop(); ent.reset(lane, kind)
+        else:
+            ent = self.cls(lane, kind); self.created += 1
+        ent.eid = eid
+        ent.set_lane_x(lane_x); ent.y = y; ent.py = y if py is None else py
+        if ent.h > self.max_h: self.max_h = ent.h
+        self.lanes[lane].append(ent); self.n += 1
+    def advance(self, dt, speed, limit):
+        # move, then recycle from the bottom whatever was already past `limit`
+        # (kept for the tick it crosses, so this tick's swept hit test still sees it)
+        free = self.free
+        for q in self.lanes:
+            for e in q: e.update(dt, speed)
+            while q and q[0].py > limit:
+                e = q.popleft(); self.on_despawn(e.eid); free.append(e); self.n -= 1
+    def first_hit(self, box, lane):
+        ay1 = box[1]; ay2 = box[3]; top = ay1 - self.max_h
+        for e in self.lanes[lane]:
+            if e.py > ay2: continue  # was already below the box
+            if e.y < top: return False  # nothing from here up is tall enough to reach the box
+            if e.hits(box): return True
+        return False
+    def collect(self, box, lane):
+        q = self.lanes[lane]; ay1 = box[1]; ay2 = box[3]; top = ay1 - self.max_h; i = 0; n = 0
+        while i < len(q):
+            e = q[i]
+            if e.py > ay2: i += 1; continue
+            if e.y < top: break
+            if e.hits(box):
+                del q[i]; self.on_despawn(e.eid); self.free.append(e); n += 1
+            else:
+                i += 1
+        self.n -= n
+        return n
+    def blocked(self, lane, y0, y1):
+        """Anything in `lane` overlapping rows y0..y1."""
+        top = y0 - self.max_h
+        for e in self.lanes[lane]:
+            if e.y > y1: continue
+            if e.y < top: break
+            if e.y + e.h >= y0: return True
+        return False
+
+RunnerRow = collections.namedtuple("RunnerRow", "eid kind lane x y px py")
+
+class RunnerArrays:
+    """Structure-of-arrays store backed by NumPy; slots [0, n) are live.
+
+    Movement, culling and the AABB test run as whole-array operations and a
+    removed entry is overwritten by the last live slot.
+    """
+    FLOAT_FIELDS = ("x", "y", "py", "w", "h")
+    INT_FIELDS = ("lane", "kind", "eid")
+    def __init__(self, on_despawn, capacity=64):
+        self.on_despawn = on_despawn
+        self.n = 0; self.cap = 0
+        self._grow(capacity)
+    def _grow(self, cap):
+        for f in self.FLOAT_FIELDS + self.INT_FIELDS:
+            a = np.zeros(cap, dtype=np.float64 if f in self.FLOAT_FIELDS else np.int64)
+            if self.cap: a[:self.n] = getattr(self, f)[:self.n]
+            setattr(self, f, a)
+        self.cap = cap
+    def __len__(self): return self.n
+    def __iter__(self):
+        n = self.n
+        for eid, kind, lane, x, y, py in zip(self.eid[:n].tolist(), self.kind[:n].tolist(), self.lane[:n].tolist(),
+                                             self.x[:n].tolist(), self.y[:n].tolist(), self.py[:n].tolist()):
+            yield RunnerRow(eid, RUNNER_KINDS[kind], lane, x, y, x, py)
+    def spawn(self, eid, lane, kind, lane_x, y, py=None):
+        if self.n == self.cap: self._grow(self.cap * 2)
+        i = self.n; w, h = runner_bounds()[kind][2:]
+        self.x[i] = lane_x - w//2; self.y[i] = y; self.py[i] = y if py is None else py
+        self.w[i] = w; self.h[i] = h
+        self.lane[i] = lane; self.kind[i] = RUNNER_KINDS.index(kind); self.eid[i] = eid
+        self.n += 1
+    def _remove(self, idx):
+        # highest index first, so the slot we copy from is never one still to be removed
+        for i in sorted(idx.tolist(), reverse=True):
+            self.on_despawn(int(self.eid[i]))
+            last = self.n - 1
+            if i != last:
+                for f in self.FLOAT_FIELDS + self.INT_FIELDS:
+                    a = getattr(self, f); a[i] = a[last]
+            self.n = last
+    def advance(self, dt, speed, limit):
+        n = self.n
+        if not n: return
+        y = self.y[:n]
+        self.py[:n] = y
+        y += speed * dt
+        gone = np.flatnonzero(self.py[:n] > limit)
+        if gone.size: self._remove(gone)
+    def _overlapping(self, box, lane):
+        # same swept test as RunnerObstacle.hits: y range is py .. y + h
+        ax1, ay1, ax2, ay2 = box; n = self.n
+        x = self.x[:n]
+        return np.flatnonzero((self.lane[:n] == lane) & (x <= ax2) & (x + self.w[:n] >= ax1) &
+                              (self.py[:n] <= ay2) & (self.y[:n] + self.h[:n] >= ay1))
+    def first_hit(self, box, lane):
+        return self.n > 0 and self._overlapping(box, lane).size > 0
+    def blocked(self, lane, y0, y1):
+        n = self.n; y = self.y[:n]
+        return bool(np.any((self.lane[:n] == lane) & (y <= y1) & (y + self.h[:n] >= y0)))
+    def collect(self, box, lane):
+        if not self.n: return 0
+        idx = self._overlapping(box, lane)
+        if idx.size: self._remove(idx)
+        return int(idx.size)
+
+# -------------------------
+# Simulation (headless game rules)
+# -------------------------
+# runner road layout
+ROAD_W = 600
+ROAD_LEFT = WIDTH//2 - ROAD_W//2
+LANE_XS = [ROAD_LEFT + (ROAD_W // (LANES+1)) * i for i in range(1, LANES+1)]
+VAN_BASE_Y = HEIGHT - 120
+
+# top-down maps. "lot" is the original single screen; bigger maps scroll with a camera.
+MAPS = {
+    "lot":      {"size": (WIDTH, HEIGHT), "workers": 4,  "vans": 1,  "hint": "Steal the van on the right! Avoid workers!"},
+    "car_park": {"size": (4096, 2560),    "workers": 80, "vans": 16, "hint": "Steal any van in the car park! Avoid workers!"},
+}
+
+def map_tiles(name):
+    """Rows of ground tile kinds covering the map, GROUND_TILE px each."""
+    w, h = MAPS[name]["size"]
+    cols = -(-w // GROUND_TILE); rows = -(-h // GROUND_TILE)
+    if name == "lot":
+        return [["kerb" if r * GROUND_TILE >= HEIGHT - 140 else "asphalt"] * cols for r in range(rows)]
+    out = []
+    for r in range(rows):
+        if r == 0 or r == rows - 1: out.append(["kerb"] * cols); continue
+        kind = "aisle" if (r - 1) % 5 == 0 else "bay"
+        row = ["kerb"] + ["asphalt"] * 3 + [kind] * (cols - 5) + ["kerb"]
+        if kind == "bay":  # planter strips split each bay block; the aisles are the way through
+            for c in range(6, cols - 2, 12): row[c] = "planter"
+        out.append(row)
+    return out
+
+def map_van_slots(name):
+    """Where vans may be parked: top-left corners inside bay tiles next to an aisle."""
+    w, h = MAPS[name]["size"]
+    if name == "lot": return [(w - 160, h // 2 - 26)]
+    tiles = map_tiles(name); out = []
+    for r, row in enumerate(tiles):
+        near_aisle = "aisle" in (tiles[r - 1][8], tiles[(r + 1) % len(tiles)][8])
+        for c, kind in enumerate(row):
+            if kind == "bay" and near_aisle and c * GROUND_TILE > w // 3:
+                out.append((c * GROUND_TILE, r * GROUND_TILE + 8))
+    return out
+
+# -------------------------
+# Top-down navigation
+# -------------------------
+# Walkers are steered by their feet, (x, y) + nav_foot(), over NAV_CELL squares; a cell
+# is blocked when a NAV_BLOCKED ground tile covers it. Maps without blocked cells get
+# no NavGrid at all and keep the straight-line movement.
+NAV_CELL = 32
+NAV_BLOCKED = {"planter"}
+NAV_STEPS = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+             (1, 1, 1.414), (1, -1, 1.414), (-1, 1, 1.414), (-1, -1, 1.414)]
+FLOW_RADIUS = 20     # cells around the player the chase field covers (chasers give up at 420px)
+NAV_PATH_CACHE = 4096
+_nav = {}
+
+def nav_foot():
+    # bottom centre of the player sprite (sprite_bounds memoises)
+    x0, _, x1, y1 = sprite_bounds("alex")
+    return (x0 + x1) // 2, y1
+
+def top_reach(a, b):
+    # centre distance at which two top-down sprites' opaque boxes meet side by side
+    ax0, _, ax1, _ = sprite_bounds(a); bx0, _, bx1, _ = sprite_bounds(b)
+    return (ax1 - ax0 + bx1 - bx0) / 2
+
+def nav_grid(name):
+    """The map's NavGrid, built once per process; None when nothing on the map blocks."""
+    if name not in _nav:
+        tiles = map_tiles(name)
+        _nav[name] = NavGrid(tiles, MAPS[name]["size"]) if any(k in NAV_BLOCKED for row in tiles for k in row) else None
+    return _nav[name]
+
+class NavGrid:
+    """Walkable cells of a top-down map plus cached patrol paths and the shared chase field.
+
+    Cells are flat indices (row * cols + col). path() is A* followed by string
+    pulling, memoised per (start, goal) cell pair; flow() hands out one FlowField
+    per player cell, so all chasers share a single search.
+    """
+    def __init__(self, tiles, size):
+        self.cols = cols = -(-size[0] // NAV_CELL); self.rows = -(-size[1] // NAV_CELL)
+        self.blocked = bytearray(cols * self.rows); k = GROUND_TILE // NAV_CELL
+        for r, row in enumerate(tiles):
+            for c, kind in enumerate(row):
+                if kind not in NAV_BLOCKED: continue
+                for y in range(r * k, min(self.rows, r * k + k)):
+                    self.blocked[y * cols + c * k:y * cols + min(cols, c * k + k)] = b"\1" * min(k, cols - c * k)
+        self.foot = nav_foot()
+        self.paths = {}
+        self.field = None
+        self.searches = 0  # A* / Dijkstra runs, for the bench
+    def cell(self, x, y):
+        fx, fy = self.foot
+        cx = min(self.cols - 1, max(0, int((x + fx) // NAV_CELL)))
+        cy = min(self.rows - 1, max(0, int((y + fy) // NAV_CELL)))
+        return cy * self.cols + cx
+    def centre(self, i):
+        """Entity position (top-left) that puts its feet in the middle of cell i."""
+        cy, cx = divmod(i, self.cols); fx, fy = self.foot
+        return cx * NAV_CELL + NAV_CELL // 2 - fx, cy * NAV_CELL + NAV_CELL // 2 - fy
+    def slide(self, x0, y0, x1, y1):
+        # blocked moves keep whichever axis is still free
+        bl = self.blocked; cell = self.cell; fx, fy = self.foot
+        cx = int((x1 + fx) // NAV_CELL); cy = int((y1 + fy) // NAV_CELL)
+        if 0 <= cx < self.cols and 0 <= cy < self.rows:  # inline cell() for the common open move
+            if not bl[cy * self.cols + cx]: return x1, y1
+        elif not bl[cell(x1, y1)]: return x1, y1
+        if not bl[cell(x1, y0)]: return x1, y0
+        if not bl[cell(x0, y1)]: return x0, y1
+        return x0, y0
+    def snap(self, x, y):
+        """(x, y) if its cell is open, else the centre of the nearest open cell."""
+        i = self.cell(x, y)
+        if not self.blocked[i]: return x, y
+        cols = self.cols; todo = collections.deque([i]); seen = {i}
+        while todo:
+            i = todo.popleft()
+            if not self.blocked[i]: return self.centre(i)
+            r, c = divmod(i, cols)
+            for dx, dy, _ in NAV_STEPS[:4]:
+                nx = c + dx; ny = r + dy; j = ny * cols + nx
+                if 0 <= nx < cols and 0 <= ny < self.rows and j not in seen: seen.add(j); todo.append(j)
+        return x, y  # nothing open anywhere: leave the point alone
+    def line_clear(self, a, b):
+        """No blocked cell on the segment between the centres of a and b (half-cell samples)."""
+        cols = self.cols; bl = self.blocked
+        ay, ax = divmod(a, cols); by, bx = divmod(b, cols)
+        n = 2 * max(abs(bx - ax), abs(by - ay))
+        for k in range(1, n):
+            t = k / n
+            if bl[int(ay + 0.5 + (by - ay) * t) * cols + int(ax + 0.5 + (bx - ax) * t)]: return False
+        return True
+    def search(self, src, dst=None, radius=0):
+        """Dijkstra from src over open cells, A* when dst is given, limited to `radius`
+        cells (Chebyshev) when set. Returns {cell: previous cell on the way from src}."""
+        self.searches += 1
+        cols = self.cols; rows = self.rows; bl = self.blocked
+        sy, sx = divmod(src, cols)
+        if dst is not None: gy, gx = divmod(dst, cols)
+        came = {src: src}; cost = {src: 0.0}; heap = [(0.0, 0.0, src)]
+        while heap:
+            _, g, i = heapq.heappop(heap)
+            if i == dst: break
+            if g > cost[i]: continue
+            y, x = divmod(i, cols)
+            for dx, dy, w in NAV_STEPS:
+                nx = x + dx; ny = y + dy
+                if not (0 <= nx < cols and 0 <= ny < rows): continue
+                if radius and (abs(nx - sx) > radius or abs(ny - sy) > radius): continue
+                j = ny * cols + nx
+                if bl[j] or (dx and dy and (bl[y * cols + nx] or bl[ny * cols + x])): continue  # no corner cutting
+                ng = g + w
+                if ng < cost.get(j, 1e18):
+                    cost[j] = ng; came[j] = i; h = 0.0
+                    if dst is not None:
+                        hx = abs(gx - nx); hy = abs(gy - ny); h = max(hx, hy) + 0.414 * min(hx, hy)
+                    heapq.heappush(heap, (ng + h, ng, j))
+        return came
+    def path(self, a, b):
+        """Cells to steer through from a to b (b last), with straight runs pulled tight."""
+        key = (a, b); out = self.paths.get(key)
+        if out is not None: return out
+        if a == b or self.line_clear(a, b):
+            out = [b]
+        else:
+            came = self.search(a, b)
+            if b not in came:
+                out = [b]  # walled off: head straight and let slide() cope
+            else:
+                cells = [b]
+                while cells[-1] != a: cells.append(came[cells[-1]])
+                cells.reverse(); out = []; cur = a; k = 1
+                while cur != b:
+                    j = len(cells) - 1
+                    while j > k and not self.line_clear(cur, cells[j]): j -= 1
+                    cur = cells[j]; out.append(cur); k = j + 1
+        if len(self.paths) >= NAV_PATH_CACHE: self.paths.clear()
+        self.paths[key] = out
+        return out
+    def waypoints(self, x0, y0, x1, y1):
+        """Positions to walk through from (x0, y0) to exactly (x1, y1)."""
+        cells = self.path(self.cell(x0, y0), self.cell(x1, y1))
+        return [self.centre(i) for i in cells[:-1]] + [(x1, y1)]
+    def flow(self, goal):
+        f = self.field
+        if f is None or f.goal != goal: f = self.field = FlowField(self, goal)
+        return f
+
+class FlowField:
+    """Chase steering toward one goal cell, shared by every chasing worker.
+
+    Answers are memoised per worker cell: if the goal is in straight view the
+    worker heads right at the player; otherwise it steps to the next cell of one
+    bounded Dijkstra from the goal, which only runs the first time it is needed.
+    """
+    def __init__(self, nav, goal):
+        self.nav = nav; self.goal = goal
+        self.direct = {}  # cell -> goal in straight view
+        self.came = None  # cell -> next cell toward the goal
+    def target(self, x, y, tx, ty):
+        nav = self.nav; i = nav.cell(x, y)
+        d = self.direct.get(i)
+        if d is None: d = self.direct[i] = nav.line_clear(i, self.goal)
+        if d: return tx, ty
+        if self.came is None: self.came = nav.search(self.goal, radius=FLOW_RADIUS)
+        n = self.came.get(i)
+        if n is None: return tx, ty  # outside the field or walled off
+        return nav.centre(n)
+
+# -------------------------
+# Runner level chunks
+# -------------------------
+# Road positions are distances along the road in px; an entry at `pos` crosses
+# SPAWN_Y when the runner has scrolled `pos`. Patterns: (name, min scroll speed,
+# obstacle rows as (offset, blocked lanes), coins as (offset, lane)); each may be mirrored.
+CHUNK_PATTERNS = [
+    ("single",   0,   [(0, (0,))],                                [(60, 0)]),
+    ("middle",   0,   [(0, (1,))],                                [(-80, 0), (-40, 0), (0, 0)]),
+    ("coins",    0,   [],                                         [(0, 1), (50, 1), (100, 1), (150, 1), (200, 1)]),
+    ("wall",     260, [(0, (0, 1))],                              [(0, 2)]),
+    ("split",    260, [(0, (0, 2))],                              [(-50, 1), (0, 1)]),
+    ("zigzag",   320, [(0, (0,)), (200, (1,)), (400, (2,))],      [(100, 2), (300, 0)]),
+    ("slalom",   380, [(0, (0, 1)), (320, (1, 2))],               [(0, 2), (320, 0)]),
+    ("gauntlet", 450, [(0, (0, 2)), (240, (0, 2)), (480, (0, 2))], [(120, 1), (360, 1)]),
+]
+CHUNK_LEN = 1600         # road px per generated chunk
+CHUNK_AHEAD = HEIGHT * 2 # keep at least this much road generated beyond the spawn line
+SPAWN_Y = -120           # screen y at which an entry appears
+LANE_SHIFT_GAP = 150     # extra road the player gets per lane change
+
+def row_clear():
+    # van height + tallest obstacle: rows closer than this overlap the van
+    rb = runner_bounds()
+    return rb["van"][3] + max(rb[k][3] for k in SPAWN_KINDS)
+
+def _reachable(lanes, last_pos, pos, blocked, clear):
+    """Lanes the van can be in when a row at `pos` passes, coming from `lanes` at the row at `last_pos`."""
+    free = [l for l in range(LANES) if l not in blocked]
+    if last_pos is None: return set(free)
+    k = max(0, int((pos - last_pos - clear) // LANE_SHIFT_GAP))
+    return {l for l in free if any(abs(l - r) <= k for r in lanes)}
+
+def build_chunk(seed, index, start, speed, lanes, last_pos):
+    """Lay out one chunk of road from CHUNK_PATTERNS.
+
+    Deterministic in (seed, index, speed), so replays rebuild the same road.
+    Every pattern is checked against the lanes reachable after the previous row
+    and swapped for a coin run if it can't be dodged. Returns (entries sorted
+    by pos as (pos, lane, kind), end pos, reachable lanes, last row pos).
+    """
+    rng = random.Random(f"{seed}:{index}")
+    gap = speed * max(0.45, 1.0 - (speed - 220.0) / 800.0)  # same spacing the old per-timer spawn had
+    options = [p for p in CHUNK_PATTERNS if p[1] <= speed]
+    clear = row_clear()
+    entries = []; pos = start
+    while pos < start + CHUNK_LEN:
+        for _ in range(4):
+            name, _, rows, coins = rng.choice(options)
+            flip = rng.random() < 0.5
+            lane_of = (lambda l: LANES - 1 - l) if flip else (lambda l: l)
+            ok = lanes; lp = last_pos
+            for off, blocked in rows:
+                ok = _reachable(ok, lp, pos + off, [lane_of(l) for l in blocked], clear); lp = pos + off
+                if not ok: break
+            if ok: break
+        else:
+            name, _, rows, coins = CHUNK_PATTERNS[2]; lane_of = lambda l: l; ok = lanes; lp = last_pos
+        lanes, last_pos = ok, lp
+        for off, blocked in rows:
+            for l in blocked: entries.append((pos + off, lane_of(l), rng.choice(SPAWN_KINDS)))
+        for off, l in coins: entries.append((pos + off, lane_of(l), "coin"))
+        pos += max([0] + [off for off, _ in rows] + [off for off, _ in coins]) + gap
+    entries.sort()
+    return entries, pos, lanes, last_pos
+
+class Simulation:
+    """One run (top-down theft, then the runner) stepped with a fixed dt and a seeded RNG.
+
+    Pure Python: no Tk, no sound, no disk. Frontends read the entity state and
+    listen to `on_event(kind, *args)`; `keys` is the live input dict.
+    `input` (InputRecorder / InputReplay) is called around every tick.
+    Events: ("sound", name), ("despawn", eid), ("phase", "runner"), ("over", result).
+    vectorized=True keeps runner obstacles/coins in NumPy arrays (RunnerArrays).
+    """
+    def __init__(self, profile, seed=None, dt=TICK, workers=None, vectorized=False, world="lot"):
+        if vectorized and not HAVE_NUMPY: raise RuntimeError("vectorized Simulation needs numpy")
+        self.profile = profile
+        self.vectorized = vectorized
+        self.next_eid = 0
+        self.owned = set(profile.get("owned", []))
+        if seed is None: seed = random.randrange(1 << 32)  # always concrete, so a run can be recorded
+        self.seed = seed; self.rng = random.Random(seed)
+        self.dt = dt
+        self.keys = {}
+        self.on_event = None
+        self.input = None
+        self.ticks = 0; self.t = 0.0
+        self.mode = "topdown"  # topdown, runner, over
+        self.result = None
+        self.run_coins = 0  # picked up during the run (steal bonus + runner coins)
+        # top-down
+        spec = MAPS[world]; self.map = world; self.world = ww, wh = spec["size"]
+        if workers is None: workers = spec["workers"]
+        self.nav = nav_grid(world)
+        self.catch_r = top_reach("alex", "worker"); self.steal_r = top_reach("alex", "van")
+        self.player = self.tag(TopPlayer(profile, self.world, self.nav))
+        self.workers = []
+        for i in range(workers):
+            x = self.rng.randint(200, ww-260); y = self.rng.randint(90, wh-150)
+            self.workers.append(self.tag(TopWorker(x, y, self.rng, self.world, self.nav)))
+        slots = map_van_slots(world)
+        if spec["vans"] < len(slots): slots = self.rng.sample(slots, spec["vans"])
+        self.vans = [self.tag(VanTop(x, y)) for x, y in slots]
+        self.van_top = self.vans[0]  # the one bots head for
+        self.grid = SpatialGrid()
+        self.van_grid = SpatialGrid(); self.van_grid.update(self.vans)  # parked: bucketed once
+        # runner
+        self.van = None
+        self.obstacles = self.coins = None  # runner stores, created by start_runner
+        self.scroll_speed = 220.0
+        self.road = 0.0  # px scrolled since the runner started
+        self.pending = collections.deque()  # generated (pos, lane, kind) entries not spawned yet
+        self.road_end = 0.0; self.chunks = 0; self.road_lanes = None; self.road_row = None
+        self.runner_score = 0.0
+        self.prof = None  # the app's Profiler while it is recording; None costs one truth test
+
+    def emit(self, kind, *args):
+        if self.on_event: self.on_event(kind, *args)
+
+    def tag_id(self):
+        self.next_eid += 1
+        return self.next_eid - 1
+
+    def tag(self, ent):
+        ent.eid = self.tag_id()
+        return ent
+
+    def despawn(self, eid):
+        self.emit("despawn", eid)
+
+    def step(self, dt=None):
+        dt = self.dt if dt is None else dt
+        inp = self.input
+        if inp: inp.before(self)
+        if self.mode == "topdown": self.update_topdown(dt)
+        elif self.mode == "runner": self.update_runner(dt)
+        if inp: inp.after(self)
+        self.ticks += 1; self.t += dt
+
+    # Topdown
+    def update_topdown(self, dt):
+        p = self.player; prof = self.prof
+        if prof: t0 = time.perf_counter()
+        p.update(dt, self.keys)
+        # one chase field per player cell; it does no work until a chaser loses sight of the player
+        flow = self.nav.flow(self.nav.cell(p.x, p.y)) if self.nav else None
+        for w in self.workers: w.update(dt, p, flow)
+        if prof: t1 = time.perf_counter(); prof.record("sim.move", t0, t1)
+        # one grid query answers collision, detection and spotting for the whole crowd
+        self.grid.update(self.workers)
+        near = self.grid.within(p.x, p.y, max(self.catch_r, p.detect_radius))
+        if prof: prof.record("sim.collide", t1, time.perf_counter())
+        # collisions
+        for w, d in near:
+            if d < self.catch_r:
+                self.emit("sound", "crash"); self.end_run(caught=True); return
+        # detection
+        eff = p.detect_radius
+        if "mask" in self.owned: eff *= 0.8
+        for w, d in near:
+            if d <= eff and self.rng.random() < 0.85:
+                self.emit("sound", "crash"); self.end_run(caught=True); return
+        # workers that saw the player give chase
+        for w, d in near:
+            if not w.chasing and d <= p.detect_radius and self.rng.random() < 0.95:
+                w.chasing = True
+        # steal van
+        for v, d in self.van_grid.within(p.x, p.y, self.steal_r):
+            if d < self.steal_r and not v.stolen:
+                v.stolen = True; self.van_top = v
+                self.run_coins += 50
+                self.start_runner()
+                return
+
+    # Runner
+    def start_runner(self):
+        self.mode = "runner"
+        self.van = self.tag(RunnerVan())
+        self.van.set_position(LANE_XS[self.van.lane], VAN_BASE_Y)
+        self.van.set_position(LANE_XS[self.van.lane], VAN_BASE_Y)  # twice: no interpolation from (0, 0)
+        if self.vectorized:
+            self.obstacles = RunnerArrays(self.despawn)
+            self.coins = RunnerArrays(self.despawn)
+        else:
+            self.obstacles = RunnerList(RunnerObstacle, self.despawn)
+            self.coins = RunnerList(Coin, self.despawn)
+        self.scroll_speed = 220.0; self.runner_score = 0.0
+        self.road = 0.0; self.pending.clear(); self.chunks = 0
+        self.road_end = 220.0  # first row arrives about a second in, like the old spawn timer
+        self.road_lanes = set(range(LANES)); self.road_row = None
+        self.emit("phase", "runner")
+        self.emit("sound", "engine")
+
+    def update_runner(self, dt):
+        self.scroll_speed += 6.0 * dt
+        self.runner_score += dt * (self.scroll_speed / 40.0)
+        prof = self.prof
+        if prof: t0 = time.perf_counter()
+        self.road += self.scroll_speed * dt
+        if self.road_end - self.road < CHUNK_AHEAD: self.next_chunk()
+        self.obstacles.advance(dt, self.scroll_speed, HEIGHT + 220)
+        self.coins.advance(dt, self.scroll_speed, HEIGHT + 200)
+        pending = self.pending
+        if pending and pending[0][0] <= self.road: self.spawn_due()
+        if prof: prof.record("sim.move", t0, time.perf_counter())
+        van = self.van
+        # lane switching (one lane per key press)
+        if self.keys.get("left"):
+            van.target = clamp(van.lane - 1, 0, LANES-1)
+            van.lane = van.target; self.keys["left"] = False
+        if self.keys.get("right"):
+            van.target = clamp(van.lane + 1, 0, LANES-1)
+            van.lane = van.target; self.keys["right"] = False
+        van.set_position(LANE_XS[van.lane], VAN_BASE_Y)
+        van_box = van.bbox()
+        # check obstacle collision (swept, van's lane only)
+        if prof: t0 = time.perf_counter()
+        hit = self.obstacles.first_hit(van_box, van.lane)
+        got = 0 if hit else self.coins.collect(van_box, van.lane)
+        if prof: prof.record("sim.collide", t0, time.perf_counter())
+        if hit:
+            self.emit("sound", "crash"); self.end_run(caught=False); return
+        # check coin collection
+        for _ in range(got):
+            self.emit("sound", "coin")
+            gained = 10
+            if "wallet2" in self.owned: gained *= 2
+            self.run_coins += gained
+
+    def next_chunk(self):
+        entries, self.road_end, self.road_lanes, self.road_row = build_chunk(
+            self.seed, self.chunks, self.road_end, self.scroll_speed, self.road_lanes, self.road_row)
+        self.pending.extend(entries); self.chunks += 1
+
+    def spawn_due(self):
+        pending = self.pending; road = self.road
+        while pending and pending[0][0] <= road:
+            pos, lane, kind = pending.popleft()
+            y = SPAWN_Y + (road - pos)  # already scrolled a little past the line this tick
+            store = self.coins if kind == "coin" else self.obstacles
+            store.spawn(self.tag_id(), lane, kind, LANE_XS[lane], y, SPAWN_Y)  # swept from the line
+
+    # ---------- End run ----------
+    def end_run(self, caught=False):
+        total_score = int(self.player.score + self.runner_score)
+        coins_earned = int(total_score // 25) + int(self.runner_score // 100)
+        if "wallet2" in self.owned: coins_earned *= 2
+        self.mode = "over"
+        self.result = {"caught": caught, "score": total_score, "coins": coins_earned,
+                       "run_coins": self.run_coins, "ticks": self.ticks, "time": self.t}
+        self.emit("over", self.result)
+
+# -------------------------
+# Input recording / replay
+# -------------------------
+REPLAY_VERSION = 6  # 2: runner road from build_chunk; 3: top-down navigation grid; 4: swept runner hits; 5: sprite hitboxes; 6: top-down reach from sprites
+REPLAY_DIR = "replays"
+
+class InputRecorder:
+    """Logs a run as its seed plus the (tick, key, state) changes the Simulation saw.
+
+    Changes are taken at the start of each tick against the keys the previous tick
+    left behind, so keys the simulation clears itself (runner lane switches) are
+    not logged twice. Replaying the log reproduces the run exactly.
+    """
+    def __init__(self, sim):
+        self.events = []; self.seen = {}
+        self.header = {"version": REPLAY_VERSION, "seed": sim.seed, "owned": sorted(sim.owned),
+                       "workers": len(sim.workers), "dt": sim.dt, "map": sim.map}
+        sim.input = self
+    def before(self, sim):
+        seen = self.seen
+        for k, v in sim.keys.items():
+            v = bool(v)
+            if v != seen.get(k, False): self.events.append((sim.ticks, k, v))
+    def after(self, sim):
+        self.seen = {k: bool(v) for k, v in sim.keys.items()}
+    def save(self, path, sim, frames=None):
+        ticks = sim.result["ticks"] + 1 if sim.result else sim.ticks  # end_run fires inside the last tick
+        log = dict(self.header, ticks=ticks, result=sim.result, events=self.events)
+        if frames: log["frames"] = frames  # FrameStats.summary() of the recorded session
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        write_atomic(path, json.dumps(log, separators=(",", ":")))
+        return path
+
+class InputReplay:
+    """Feeds a recorded log back into a fresh Simulation, tick by tick."""
+    def __init__(self, log):
+        if log.get("version") != REPLAY_VERSION: raise ValueError(f"unsupported replay version {log.get('version')}")
+        self.log = log; self.events = log["events"]; self.i = 0
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf8") as f:
+            return cls(json.load(f))
+    def make_sim(self, **kw):
+        log = self.log
+        sim = Simulation({"owned": log["owned"]}, seed=log["seed"], dt=log["dt"], workers=log["workers"],
+                         world=log.get("map", "lot"), **kw)
+        sim.input = self; self.i = 0
+        return sim
+    def before(self, sim):
+        ev = self.events; i = self.i
+        while i < len(ev) and ev[i][0] <= sim.ticks:
+            sim.keys[ev[i][1]] = ev[i][2]; i += 1
+        self.i = i
+    def after(self, sim): pass
+    def finished(self, sim):
+        # aborted recordings have no result: stop where the player pressed ESC
+        return sim.mode == "over" or sim.ticks >= self.log["ticks"]
+    def matches(self, sim):
+        # the result carries the tick count and time; unfinished logs compare at their last tick
+        if self.log["result"] is None: return sim.result is None and sim.ticks >= self.log["ticks"]
+        return sim.result == self.log["result"]
+
+# -------------------------
+# Frame pacing
+# -------------------------
+class FrameStats:
+    """Rolling window of wall-clock frame times plus missed-deadline / catch-up counters."""
+    def __init__(self, budget=TICK, size=600):
+        self.budget = budget
+        self.times = collections.deque(maxlen=size)
+        self.reset()
+    def reset(self):
+        self.times.clear(); self.frames = 0; self.missed = 0; self.catchup = 0; self.tk_calls = 0
+    def add(self, frame_dt, ticks, tk_calls=0):
+        self.times.append(frame_dt); self.frames += 1; self.tk_calls += tk_calls
+        if frame_dt > self.budget * 1.5: self.missed += 1  # at least one vsync-sized slot lost
+        if ticks > 1: self.catchup += ticks - 1
+    def percentile(self, q):
+        if not self.times: return 0.0
+        s = sorted(self.times)
+        return s[min(len(s) - 1, int(q / 100.0 * len(s)))]
+    def summary(self):
+        return {"frames": self.frames, "p50_ms": self.percentile(50) * 1000, "p95_ms": self.percentile(95) * 1000,
+                "p99_ms": self.percentile(99) * 1000, "missed": self.missed, "catchup_ticks": self.catchup,
+                "tk_calls_per_frame": self.tk_calls / max(1, self.frames)}
+
+# -------------------------
+# Instrumentation
+# -------------------------
+TRACE_LIMIT = 1000000  # spans kept for --trace (~15 min of play)
+
+class _Span:
+    __slots__ = ("prof", "name", "t0")
+    def __init__(self, prof, name): self.prof = prof; self.name = name; self.t0 = 0.0
+    def __enter__(self): self.t0 = time.perf_counter(); return self
+    def __exit__(self, *exc): self.prof.record(self.name, self.t0, time.perf_counter())
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+NULL_SPAN = _NullSpan()
+
+class Profiler:
+    """Named timing spans, summed per frame and smoothed for the F3 overlay.
+
+    `with prof.span("draw"): ...` costs one attribute check while disabled.
+    Span objects are cached per name, so the same name must not nest inside itself.
+    With trace=True every span is also kept for dump_trace() (Chrome trace format).
+    """
+    def __init__(self, history=120, trace=False):
+        self.enabled = trace
+        self.spans = {}
+        self.frame = collections.defaultdict(float)  # name -> seconds spent this frame
+        self.avg = {}  # name -> smoothed ms per frame
+        self.frames = collections.deque(maxlen=history)  # recent frame_dt, for the sparkline
+        self.trace = [] if trace else None
+    def span(self, name):
+        if not self.enabled: return NULL_SPAN
+        sp = self.spans.get(name)
+        if sp is None: sp = self.spans[name] = _Span(self, name)
+        return sp
+    def record(self, name, t0, t1):
+        self.frame[name] += t1 - t0
+        if self.trace is not None and len(self.trace) < TRACE_LIMIT: self.trace.append((name, t0, t1 - t0))
+    def end_frame(self, frame_dt):
+        if not self.enabled: return
+        self.frames.append(frame_dt)
+        for name in set(self.avg) | set(self.frame):
+            self.avg[name] = self.avg.get(name, 0.0) * 0.9 + self.frame.get(name, 0.0) * 100.0  # 0.1 * ms
+        self.frame.clear()
+    def dump_trace(self, path):
+        # load in chrome://tracing or ui.perfetto.dev
+        ev = [{"name": n, "cat": n.split(".")[0], "ph": "X", "ts": t0 * 1e6, "dur": d * 1e6, "pid": 1, "tid": 1}
+              for n, t0, d in self.trace or ()]
+        with open(path, "w", encoding="utf8") as f:
+            json.dump({"traceEvents": ev, "displayTimeUnit": "ms"}, f)
+        return len(ev)
 
 # -------------------------
 # Main App
 # -------------------------
 class VanSnatcherApp:
-    def __init__(self, root):
+    def __init__(self, root, pacing=False, store=None, trace=False, overlay=False, record=None, replay=None, world="lot",
+                 hud_rate=HUD_RATE, scale=1.0):
         self.root = root; self.root.title("Tesco:Alex's Great Adventure")
-        self.canvas = tk.Canvas(root, width=WIDTH, height=HEIGHT, bg="#111")
-        self.canvas.pack()
+        self.canvas = ScaledCanvas(root, scale, bg="#111")
+        self.canvas.pack(expand=True)  # centred; the window background letterboxes it
+        self.tk_calls = self.canvas.tk = TkCallCounter(self.canvas.tk)  # every canvas command goes through here
         # convert PIL frames to Tk PhotoImages for canvas rendering
         self.tk_assets = {
-            'alex_frames': [pil_to_tk(im) for im in ALEX_BASE],
-            'worker_frames': [pil_to_tk(im) for im in WORKER_BASE],
-            'van_frames': [pil_to_tk(im) for im in VAN_BASE],
-            'cone': pil_to_tk(CONE_BASE),
-            'crate': pil_to_tk(CRATE_BASE),
-            'coin_frames': [pil_to_tk(im) for im in COIN_BASE],
+            'alex_frames': [pil_to_tk(im) for im in sprite("alex")],
+            'worker_frames': [pil_to_tk(im) for im in sprite("worker")],
+            'van_frames': [pil_to_tk(im) for im in sprite("van")],
+            'cone': pil_to_tk(sprite("cone")[0]),
+            'crate': pil_to_tk(sprite("crate")[0]),
+            'coin_frames': [pil_to_tk(im) for im in sprite("coin")],
+            'road': pil_to_tk(road_layer()),
+            'rings': {},  # radius -> PhotoImage, made on first use
         }
+        a = self.tk_assets
+        a['obstacles'] = {"worker": a['worker_frames'][0], "cone": a['cone'], "crate": a['crate']}
+        self.tk_assets['skins'] = SkinCache({"alex": self.tk_assets['alex_frames'], "van": self.tk_assets['van_frames']})
         # load user data
-        self.data = load_users()
-        if "users" not in self.data: self.data["users"] = {}
-        self.current = self.data.get("current_user")
+        self.store = store if store is not None else JsonProfileStore()
+        atexit.register(self.store.close)  # also covers Ctrl+C / exceptions
+        self.kdf = KdfWorker(self.kdf_failed)
+        self.busy_item = None; self.busy_text = ""; self.busy_dots = 0  # "Verifying..." line while a hash runs
+        self.current = self.store.current_user()
         self.profile = None
         if self.current:
-            p = self.data["users"].get(self.current)
+            p = self.store.get(self.current)
             if p and p.get("session_active"):
                 self.profile = p
         # game state
-        self.mode = "login"  # login, menu, shop, topdown, runner
+        self.mode = "login"  # login, menu, shop, topdown, runner, gameover
         self.keys = {}
-        self.last = time.time()
-        self.top_player = None
-        self.top_workers = []
-        self.van_top = None
-        self.runner_van = None
-        self.obstacles = []
-        self.coins = []
-        self.scroll_speed = 220.0
-        self.obs_timer = 0.0
-        self.obs_interval = 1.0
-        self.runner_score = 0.0
-        self.canvas.image_cache = []  # keep refs to PhotoImage
+        self.last = time.perf_counter()
+        self.next_frame = self.last + TICK  # absolute deadline of the next loop() call
+        self.acc = 0.0; self.alpha = 0.0  # fixed-step accumulator and render interpolation factor
+        self.frame_stats = FrameStats(); self.pacing = pacing
+        self.sim = None  # Simulation of the current run
+        self.record = record; self.recorder = None  # record: directory for per-run input logs
+        self.replay = replay  # InputReplay shown instead of live play
+        self.prof = Profiler(trace=trace); self.overlay = False; self.overlay_tick = 0
+        if overlay: self.toggle_overlay()
+        self.items = {}  # entity eid -> SpriteItem
+        self.rings = {}  # worker eid -> detection ring SpriteItem, while on screen
+        self.shown = set()  # eids of top-down entities that currently have canvas items
+        self.hud = Hud(self.canvas, hud_rate)
+        self.world = world; self.backgrounds = {}  # map name -> WorldBackground
+        self.cam = (0, 0); self.view = (WIDTH, HEIGHT)  # camera top-left and scrollregion size
         self.bind_keys()
+        self.root.bind("<Configure>", self.on_resize)
         # start screen
-        if self.profile:
+        if self.replay:
+            self.profile = {"owned": list(replay.log["owned"]), "equipped": {"alex": "alex_grey", "van": "van_blue"}}
+            self.refresh_skins()
+            self.start_topdown(replay.make_sim())
+        elif self.profile:
+            self.refresh_skins()
             self.show_menu()
         else:
             self.show_login()
@@ -499,7 +1886,7 @@ class VanSnatcherApp:
 
     # ---------- UI screens ----------
     def show_login(self):
-        self.mode = "login"; self.canvas.delete("all"); self.canvas.image_cache.clear()
+        self.mode = "login"; self.canvas.delete("all")
         # animated background: moving stripes
         self.canvas.create_text(WIDTH//2, 72, text="Tesco:Alex's Great Adventure — LOG IN / SIGN UP", font=("Consolas",22), fill="#fff")
         bx, by, bw, bh = WIDTH//2 - 120, 180, 240, 50
@@ -511,47 +1898,96 @@ class VanSnatcherApp:
         self.canvas.create_text(bx+bw//2, by+160+bh//2, text="Quit", font=("Consolas", 16, "bold"))
         self.canvas.tag_bind(r1, "<Button-1>", lambda e: self.login_dialog())
         self.canvas.tag_bind(r2, "<Button-1>", lambda e: self.signup_dialog())
-        self.canvas.tag_bind(r3, "<Button-1>", lambda e: self.root.destroy())
+        self.canvas.tag_bind(r3, "<Button-1>", lambda e: self.quit())
+
+    def set_busy(self, text):
+        # status line on the login screen while the KDF thread works; loop() animates it
+        if self.busy_item is not None: self.canvas.delete(self.busy_item); self.busy_item = None
+        self.busy_text = text or ""
+        if text: self.busy_item = self.canvas.create_text(WIDTH//2, 440, text=text, font=FONT, fill="#ffd")
+
+    def kdf_failed(self, err):
+        # a corrupt stored hash or a failed profile write: report it and stay on the screen
+        self.set_busy(None)
+        messagebox.showerror("Account", f"That didn't work: {err}")
 
     def login_dialog(self):
+        if self.kdf.pending: return
         username = simpledialog.askstring("Login", "Username:", parent=self.root)
         if not username: return
         password = simpledialog.askstring("Login", "Password:", show="*", parent=self.root)
         if password is None: return
-        user = self.data["users"].get(username)
+        user = self.store.get(username)
         if not user:
             messagebox.showerror("Login", "User not found.")
             return
-        if verify_password(user["pw_hash"], user["pw_salt"], password):
-            self.current = username; self.profile = user
-            self.profile["session_active"] = True
-            self.data["current_user"] = username
-            save_users(self.data)
-            play_sound("click")
-            messagebox.showinfo("Welcome", f"Welcome back, {username}!")
-            self.show_menu()
-        else:
+        self.set_busy("Verifying")
+        args = (user["pw_hash"], user["pw_salt"], password, user.get("pw_iter", LEGACY_ITERATIONS))
+        self.kdf.submit(verify_password, args, lambda ok: self.login_done(username, user, password, ok))
+
+    def login_done(self, username, user, password, ok):
+        self.set_busy(None)
+        if self.mode != "login": return
+        if not ok:
             messagebox.showerror("Login", "Incorrect password.")
+            return
+        self.current = username; self.profile = user
+        self.profile["session_active"] = True
+        self.store.put(username, user); self.store.set_current(username)
+        if needs_rehash(user):
+            # upgrade to the current work factor in the background; the menu doesn't wait for it
+            self.kdf.submit(hash_password, (password,), lambda res: self.rehash_done(username, res))
+        self.refresh_skins()
+        play_sound("click")
+        messagebox.showinfo("Welcome", f"Welcome back, {username}!")
+        self.show_menu()
+
+    def rehash_done(self, username, res):
+        user = self.profile if username == self.current else self.store.get(username)
+        if not user: return
+        user["pw_hash"], user["pw_salt"] = res; user["pw_iter"] = PBKDF2_ITERATIONS
+        self.store.put(username, user)
 
     def signup_dialog(self):
+        if self.kdf.pending: return
         username = simpledialog.askstring("Sign up", "Pick a username:", parent=self.root)
         if not username: return
-        if username in self.data["users"]:
+        if self.store.exists(username):
             messagebox.showerror("Sign up", "Username already exists.")
             return
         password = simpledialog.askstring("Sign up", "Pick a password:", show="*", parent=self.root)
         if password is None: return
-        h,s = hash_password(password)
-        profile = {"pw_hash":h, "pw_salt":s, "coins":0, "highscore":0, "owned":[], "equipped":{"alex":"alex_grey","van":"van_blue"}, "multiplier":1.0, "session_active":True}
-        self.data["users"][username] = profile
-        self.data["current_user"] = username
-        save_users(self.data)
+        self.set_busy("Creating account")
+        self.kdf.submit(hash_password, (password,), lambda res: self.signup_done(username, res))
+
+    def signup_done(self, username, res):
+        self.set_busy(None)
+        if self.mode != "login": return
+        if self.store.exists(username):  # taken while we were hashing
+            messagebox.showerror("Sign up", "Username already exists.")
+            return
+        h,s = res
+        profile = {"pw_hash":h, "pw_salt":s, "pw_iter":PBKDF2_ITERATIONS, "coins":0, "highscore":0, "owned":[], "equipped":{"alex":"alex_grey","van":"van_blue"}, "multiplier":1.0, "session_active":True}
+        self.store.put(username, profile); self.store.set_current(username)
         self.current = username; self.profile = profile
+        self.refresh_skins()
         play_sound("click"); messagebox.showinfo("Account", "Account created and logged in.")
         self.show_menu()
 
+    def quit(self):
+        self.kdf.shutdown()
+        try:
+            self.store.flush()
+        except Exception as e:
+            messagebox.showerror("Save failed", f"Your progress could not be saved:\n{e}")
+        self.root.destroy()
+
+    def refresh_skins(self):
+        # (re)build tinted frames for the equipped cosmetics; no-op when unchanged
+        self.tk_assets['skins'].equip(self.profile.get("equipped", {}) if self.profile else {})
+
     def show_menu(self):
-        self.mode = "menu"; self.canvas.delete("all"); self.canvas.image_cache.clear()
+        self.mode = "menu"; self.canvas.delete("all")
         self.canvas.create_text(WIDTH//2, 64, text=f"Tesco:Alex's Great Adventure — {self.current}", font=("Consolas",24), fill="#fff")
         bx,by,bw,bh = WIDTH//2-140, 160, 280, 56
         r1 = self.canvas.create_rectangle(bx,by,bx+bw,by+bh, fill="#2a9d8f")
@@ -565,22 +2001,21 @@ class VanSnatcherApp:
         self.canvas.tag_bind(r1, "<Button-1>", lambda e: self.start_topdown())
         self.canvas.tag_bind(r2, "<Button-1>", lambda e: self.open_shop())
         self.canvas.tag_bind(r3, "<Button-1>", lambda e: self.logout())
-        self.canvas.tag_bind(r4, "<Button-1>", lambda e: self.root.destroy())
+        self.canvas.tag_bind(r4, "<Button-1>", lambda e: self.quit())
         coins = self.profile.get("coins",0); hs = self.profile.get("highscore",0)
         equip = self.profile.get("equipped",{})
         self.canvas.create_text(WIDTH//2, 520, text=f"Coins: {coins}   Best: {hs}   Alex: {equip.get('alex')}   Van: {equip.get('van')}", font=("Consolas",12), fill="#ddd")
 
     def logout(self):
         if self.current:
-            self.data["users"][self.current] = self.profile
             self.profile["session_active"] = False
-            self.data["current_user"] = None
-            save_users(self.data)
+            self.store.put(self.current, self.profile); self.store.set_current(None)
         self.current = None; self.profile = None
+        self.refresh_skins()
         self.show_login()
 
     def open_shop(self):
-        self.mode = "shop"; self.canvas.delete("all"); self.canvas.image_cache.clear()
+        self.mode = "shop"; self.canvas.delete("all")
         self.canvas.create_text(WIDTH//2, 44, text="SHOP — Cosmetics & Upgrades", font=("Consolas",20), fill="#fff")
         starty = 100
         for idx, item in enumerate(SHOP_ITEMS):
@@ -612,37 +2047,78 @@ class VanSnatcherApp:
             self.profile.setdefault("equipped", {})["alex"] = uid
         if item.get("category") == "van":
             self.profile.setdefault("equipped", {})["van"] = uid
+        self.refresh_skins()
         play_sound("coin"); self.show_popup("Purchase successful!")
-        self.data["users"][self.current] = self.profile; save_users(self.data)
+        self.store.put(self.current, self.profile)
         self.open_shop()
 
     def show_popup(self, text, ttl=900):
-        self.canvas.delete("popup"); x0 = WIDTH//2-180; y0 = HEIGHT//2-32
+        cx, cy = self.cam
+        self.canvas.delete("popup"); x0 = cx+WIDTH//2-180; y0 = cy+HEIGHT//2-32
         self.canvas.create_rectangle(x0,y0,x0+360,y0+64, fill="#111", outline="#555", tags="popup")
-        self.canvas.create_text(WIDTH//2, HEIGHT//2, text=text, font=("Consolas", 12), fill="#fff", tags="popup")
+        self.canvas.create_text(cx+WIDTH//2, cy+HEIGHT//2, text=text, font=("Consolas", 12), fill="#fff", tags="popup")
         self.root.after(ttl, lambda: self.canvas.delete("popup"))
 
     # ---------- Gameplay ----------
-    def start_topdown(self):
-        self.mode = "topdown"; self.canvas.delete("all"); self.canvas.image_cache.clear()
-        self.top_player = TopPlayer(self.tk_assets, self.profile); self.top_player.apply_profile()
-        self.top_workers = []
-        for i in range(4):
-            x = random.randint(200, WIDTH-260); y = random.randint(90, HEIGHT-150)
-            self.top_workers.append(TopWorker(x, y, self.tk_assets))
-        self.van_top = VanTop(WIDTH-160, HEIGHT//2 - 26, self.tk_assets, self.profile)
-        self.last = time.time(); self.show_popup("Steal the van on the right. Avoid workers!")
+    def start_topdown(self, sim=None):
+        self.mode = "topdown"; self.canvas.delete("all")
+        if sim is None:
+            self.sim = Simulation(self.profile, world=self.world)
+            self.sim.keys = self.keys  # live input; a replay keeps its own dict
+            if self.record: self.recorder = InputRecorder(self.sim)
+        else:
+            self.sim = sim
+        self.sim.on_event = self.on_sim_event
+        self.sim.prof = self.prof if self.prof.enabled else None
+        self.acc = 0.0; self.alpha = 0.0; self.frame_stats.reset()
+        self.setup_topdown()  # create the entity items before the popup so it stays on top
+        self.show_popup(MAPS[self.sim.map]["hint"])
+
+    def setup_topdown(self):
+        c = self.canvas; c.delete("all")
+        name = self.sim.map
+        if name not in self.backgrounds: self.backgrounds[name] = WorldBackground(name)
+        self.bg = self.backgrounds[name]; self.bg.reset(); self.bg.build(c)  # also re-run by redraw() after a resize
+        # hidden z-order markers: culled entities come and go, so new items are slotted under these
+        for tag in ("z_ring", "z_actor", "z_player"):
+            c.create_line(0, 0, 0, 0, state="hidden", tags=tag)
+        self.hud.reset(); self.rings = {}; self.items = {}; self.shown = set()
+        self.draw_topdown()
 
     def start_runner(self):
-        self.mode = "runner"; self.canvas.delete("all"); self.canvas.image_cache.clear()
-        road_w = 600; left = WIDTH//2 - road_w//2; step = road_w // (LANES+1)
-        self.LANE_XS = [left + step*i for i in range(1,LANES+1)]
-        self.runner_van = RunnerVan(self.tk_assets, self.profile)
-        self.runner_van.lane = LANES//2; self.runner_van.set_position(self.LANE_XS[self.runner_van.lane], HEIGHT-120)
-        self.obstacles = []; self.coins = []
-        self.scroll_speed = 220.0; self.obs_timer = 0.0; self.runner_score = 0.0
-        self.top_player.coins_collected = 0
-        play_sound("engine")
+        self.mode = "runner"; self.canvas.delete("all")
+        self.set_camera(0, 0)
+        c = self.canvas
+        # road and lane markings: one pre-rendered image, shifted by the scroll offset
+        self.road_item = c.create_image(ROAD_LEFT - 8, -sum(ROAD_DASH), image=self.tk_assets['road'], anchor="nw")
+        self.road_off = 0
+        # hidden z-order markers: entities spawned later are lowered beneath these
+        for tag in ("z_coin", "z_van", "z_hud"):
+            c.create_line(0, 0, 0, 0, state="hidden", tags=tag)
+        self.hud.reset(); self.items = {}
+
+    def on_sim_event(self, kind, *args):
+        if kind == "sound": play_sound(args[0])
+        elif kind == "despawn":
+            item = self.items.pop(args[0], None)
+            if item is not None: item.delete(self.canvas)
+        elif kind == "phase": self.start_runner()
+        elif kind == "over": self.end_run(args[0])
+
+    def save_recording(self):
+        if not self.recorder: return
+        path = os.path.join(self.record, time.strftime("run-%Y%m%d-%H%M%S.json"))
+        print(f"input log written to {self.recorder.save(path, self.sim, self.frame_stats.summary())}")
+        self.recorder = None
+
+    def abort_run(self):
+        if self.replay: return self.quit()
+        self.save_recording()
+        # ESC mid-run: keep the coins already picked up, like before
+        if self.sim and self.sim.mode != "over":
+            self.profile["coins"] = self.profile.get("coins",0) + self.sim.run_coins
+        self.sim = None; self.set_camera(0, 0)
+        self.show_menu()
 
     # ---------- Input ----------
     def bind_keys(self):
@@ -653,8 +2129,10 @@ class VanSnatcherApp:
             if k in ("up","w"): self.keys["up"]=True
             if k in ("down","s"): self.keys["down"]=True
             if k == "space": self.keys["sprint"]=True
+            if k == "f3": self.toggle_overlay()
+            if k == "f11": self.root.attributes("-fullscreen", not self.root.attributes("-fullscreen"))
             if k == "escape":
-                if self.mode in ("topdown","runner"): self.show_menu()
+                if self.mode in ("topdown","runner"): self.abort_run()
         def release(e):
             k = e.keysym.lower()
             if k in ("left","a"): self.keys["left"]=False
@@ -664,155 +2142,248 @@ class VanSnatcherApp:
             if k == "space": self.keys["sprint"]=False
         self.root.bind("<KeyPress>", press); self.root.bind("<KeyRelease>", release)
 
+    def on_resize(self, e):
+        # children report through the toplevel's binding too; only the window size matters
+        if e.widget is self.root and self.canvas.set_scale(fit_scale(e.width, e.height)): self.redraw()
+
+    def redraw(self):
+        # rebuild the current screen at the canvas's new scale
+        a = self.tk_assets
+        self.canvas.prescale(a['alex_frames'] + a['worker_frames'] + a['van_frames'] + a['coin_frames'] +
+                             [a['cone'], a['crate'], a['road']] + list(a['skins'].frames.values()))
+        view, self.view = self.view, None; self.set_camera(*self.cam, view)  # re-send the scroll region
+        if self.mode == "login": self.show_login()
+        elif self.mode == "menu": self.show_menu()
+        elif self.mode == "shop": self.open_shop()
+        elif self.mode == "topdown": self.setup_topdown()
+        elif self.mode == "runner": self.start_runner()
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.prof.enabled = self.overlay or self.prof.trace is not None
+        if self.sim: self.sim.prof = self.prof if self.prof.enabled else None
+        self.canvas.delete("prof")
+
+    def draw_overlay(self):
+        # redrawn from scratch a few times a second: cheap, and survives canvas.delete("all")
+        c = self.canvas; p = self.prof; c.delete("prof")
+        fs = list(p.frames)
+        if not fs: return
+        x0, y0, w, h = self.cam[0] + WIDTH - 270, self.cam[1] + HEIGHT - 200, 260, 190
+        c.create_rectangle(x0, y0, x0 + w, y0 + h, fill="#000", outline="#555", stipple="gray50", tags="prof")
+        fps = len(fs) / max(1e-9, sum(fs))
+        lines = [f"FPS {fps:5.1f}   frame {fs[-1] * 1000:5.1f} ms (max {max(fs) * 1000:.1f})"]
+        lines += [f"{name:<12} {ms:6.2f} ms" for name, ms in sorted(p.avg.items())]
+        sim = self.sim if self.mode in ("topdown", "runner") else None
+        if sim and sim.mode == "topdown": lines.append(f"workers {len(sim.workers)}")
+        elif sim and sim.obstacles is not None: lines.append(f"obstacles {len(sim.obstacles)}  coins {len(sim.coins)}")
+        lines.append(f"canvas items {len(c.find_all())}  sprites {len(self.items)}")
+        lines.append(f"tk calls/frame {self.tk_calls.last}")
+        c.create_text(x0 + 8, y0 + 6, anchor="nw", text="\n".join(lines), font=("Consolas", 10), fill="#cfc", tags="prof")
+        # sparkline of frame times, 0..50 ms, with the 60 FPS budget as a reference line
+        sy = y0 + h - 6; sh = 40; step = w / max(1, p.frames.maxlen - 1)
+        by = sy - sh * TICK / 0.05
+        c.create_line(x0, by, x0 + w, by, fill="#664", dash=(2, 3), tags="prof")
+        if len(fs) > 1:
+            pts = []
+            for i, f in enumerate(fs): pts += [x0 + i * step, sy - sh * min(f, 0.05) / 0.05]
+            c.create_line(*pts, fill="#8f8", tags="prof")
+
+    def set_camera(self, x, y, view=(WIDTH, HEIGHT)):
+        # scroll the canvas instead of moving every item; screen-fixed items ride along
+        x = int(x); y = int(y); c = self.canvas
+        if view != self.view:
+            c.configure(scrollregion=(0, 0) + tuple(view)); self.view = view
+        elif (x, y) == self.cam:
+            return
+        dx = x - self.cam[0]; dy = y - self.cam[1]
+        c.xview_moveto(x / view[0]); c.yview_moveto(y / view[1])
+        if dx or dy:
+            for tag in ("hud", "popup", "prof"): c.move(tag, dx, dy)
+        self.cam = self.hud.origin = (x, y)
+
+    def place(self, ent, img, layer=None, origin=(0, 0)):
+        # draw between the last two simulation ticks; origin: sprite corner relative to the entity's box
+        a = self.alpha
+        x = ent.px + (ent.x - ent.px) * a - origin[0]; y = ent.py + (ent.y - ent.py) * a - origin[1]
+        item = self.items.get(ent.eid)
+        if item is None: item = self.items[ent.eid] = SpriteItem()
+        item.place(self.canvas, x, y, img, layer)
+
     # ---------- Loop ----------
     def loop(self):
-        now = time.time(); dt = clamp(now - self.last, 1/1000.0, 1/30.0); self.last = now
-        if self.mode == "topdown": self.update_topdown(dt)
-        elif self.mode == "runner": self.update_runner(dt)
-        self.root.after(int(1000/FPS), self.loop)
-
-    # Topdown
-    def update_topdown(self, dt):
-        self.top_player.update(dt, self.keys)
-        for w in self.top_workers: w.update(dt, self.top_player)
-        # collisions
-        for w in self.top_workers:
-            if math.hypot(w.x - self.top_player.x, w.y - self.top_player.y) < 28:
-                play_sound("crash"); self.end_run(caught=True); return
-        # detection
-        for w in self.top_workers:
-            eff = self.top_player.detect_radius
-            if "mask" in self.profile.get("owned", []): eff *= 0.8
-            if math.hypot(w.x - self.top_player.x, w.y - self.top_player.y) <= eff and random.random() < 0.85:
-                play_sound("crash"); self.end_run(caught=True); return
-        # steal van
-        if not self.van_top.stolen and math.hypot(self.van_top.x - self.top_player.x, self.van_top.y - self.top_player.y) < 56:
-            self.van_top.stolen = True
-            gained = 50; self.profile["coins"] = self.profile.get("coins",0) + gained; self.top_player.coins_collected += gained
-            self.start_runner(); return
-        self.draw_topdown()
+        now = time.perf_counter(); frame_dt = now - self.last; self.last = now
+        try:
+            if self.kdf.pending:
+                self.kdf.poll()  # finished hashes call back into the UI from here
+                dots = int(now * 4) % 4
+                if self.busy_item is not None and dots != self.busy_dots:
+                    self.canvas.itemconfig(self.busy_item, text=self.busy_text + "." * dots); self.busy_dots = dots
+            if self.mode in ("topdown", "runner"):
+                # fixed-step simulation; a slow frame is caught up with several ticks
+                self.acc += min(frame_dt, MAX_FRAME_DT)
+                ticks = 0
+                with self.prof.span("step"):
+                    while self.acc >= TICK and self.mode in ("topdown", "runner"):
+                        self.sim.step()  # may switch to the runner or end the run via on_sim_event
+                        self.acc -= TICK; ticks += 1
+                        if self.replay and self.mode != "gameover" and self.replay.finished(self.sim):
+                            self.end_replay(); break
+                self.alpha = self.acc / TICK
+                self.hud.frame(now)
+                with self.prof.span("draw"):
+                    if self.mode == "topdown": self.draw_topdown()
+                    elif self.mode == "runner": self.draw_runner()
+                self.frame_stats.add(frame_dt, ticks, self.tk_calls.take())
+            if self.prof.enabled:
+                self.prof.end_frame(frame_dt)
+                if self.overlay:
+                    self.overlay_tick += 1
+                    if self.overlay_tick % 10 == 0:
+                        with self.prof.span("overlay"): self.draw_overlay()
+                # flush Tk's redraw now so its share shows up as a span instead of hiding in frame_dt
+                with self.prof.span("tk"): self.root.update_idletasks()
+        finally:
+            # always reschedule (an exception above must not freeze the window), against
+            # absolute deadlines so after()'s whole milliseconds don't drift
+            self.next_frame += TICK
+            if self.next_frame < now: self.next_frame = now + TICK  # fell behind: resync instead of bursting
+            self.root.after(max(1, round((self.next_frame - time.perf_counter()) * 1000)), self.loop)
 
     def draw_topdown(self):
-        c=self.canvas; c.delete("all"); c.image_cache.clear()
-        c.create_rectangle(0,0,WIDTH,HEIGHT,fill="#2c3338")
-        c.create_rectangle(0,HEIGHT-140,WIDTH,HEIGHT,fill="#222")
-        self.van_top.draw(c)
-        for w in self.top_workers:
-            c.create_oval(w.x - self.top_player.detect_radius, w.y - self.top_player.detect_radius,
-                          w.x + self.top_player.detect_radius, w.y + self.top_player.detect_radius,
-                          outline="#662222", width=1, stipple="gray50")
-            w.draw(c)
-        self.top_player.draw(c)
-        c.create_text(12,12,anchor="nw", text=f"Stamina: {int(self.top_player.stamina)}", font=FONT, fill="#fff")
-        c.create_text(12,34,anchor="nw", text=f"Coins: {self.profile.get('coins',0)}", font=FONT, fill="#fff")
-        c.create_text(12,56,anchor="nw", text=f"Score: {int(self.top_player.score)}", font=FONT, fill="#fff")
-        if not self.van_top.stolen:
-            c.create_text(WIDTH//2, 18, text="Steal the van on the right! Avoid workers!", font=FONT, fill="#ffd")
-
-    # Runner
-    def update_runner(self, dt):
-        self.scroll_speed += 6.0 * dt
-        self.runner_score += dt * (self.scroll_speed / 40.0)
-        self.obs_timer += dt
-        self.obs_interval = max(0.45, 1.0 - (self.scroll_speed - 220.0) / 800.0)
-        if self.obs_timer >= self.obs_interval:
-            self.spawn_obstacle()
-            self.obs_timer = 0.0
-        for ob in list(self.obstacles):
-            ob.update(dt, self.scroll_speed)
-            if ob.y > HEIGHT + 220: self.obstacles.remove(ob)
-        for coin in list(self.coins):
-            coin.update(dt, self.scroll_speed)
-            if coin.y > HEIGHT + 200: self.coins.remove(coin)
-        # lane switching
-        if self.keys.get("left"):
-            self.runner_van.target = clamp(self.runner_van.lane - 1, 0, LANES-1)
-            self.runner_van.lane = self.runner_van.target; self.keys["left"] = False
-        if self.keys.get("right"):
-            self.runner_van.target = clamp(self.runner_van.lane + 1, 0, LANES-1)
-            self.runner_van.lane = self.runner_van.target; self.keys["right"] = False
-        # set van pos
-        road_w = 600; left = WIDTH//2 - road_w//2; step = road_w // (LANES+1)
-        lane_xs = [left + step*i for i in range(1,LANES+1)]
-        self.runner_van.set_position(lane_xs[self.runner_van.lane], HEIGHT-120)
-        van_box = (self.runner_van.x, self.runner_van.y, self.runner_van.x + self.runner_van.width, self.runner_van.y + self.runner_van.height)
-        # check obstacle collision
-        for ob in self.obstacles:
-            if rects_overlap(van_box, ob.bbox()):
-                play_sound("crash"); self.end_run(caught=False); return
-        # check coin collection
-        for coin in list(self.coins):
-            if rects_overlap(van_box, coin.bbox()):
-                play_sound("coin"); self.coins.remove(coin)
-                gained = 10
-                if "wallet2" in self.profile.get("owned", []): gained *= 2
-                self.profile["coins"] = self.profile.get("coins",0) + gained
-                self.top_player.coins_collected += gained
-        self.draw_runner()
-
-    def spawn_obstacle(self):
-        lane = random.randint(0, LANES-1)
-        kinds = ["worker"]*6 + ["cone"]*3 + ["crate"]*2
-        kind = random.choice(kinds)
-        ob = RunnerObstacle(lane, kind, self.tk_assets)
-        road_w = 600; left = WIDTH//2 - road_w//2; step = road_w // (LANES+1)
-        lane_x = left + step*(lane+1)
-        ob.set_lane_x(lane_x)
-        ob.y = -random.randint(60, 200)
-        self.obstacles.append(ob)
-        # sometimes spawn a coin near obstacle
-        if random.random() < 0.45:
-            coin = Coin(lane, self.tk_assets)
-            coin.set_lane_x(lane_x)
-            coin.y = ob.y - 60
-            self.coins.append(coin)
+        c=self.canvas; sim=self.sim; a=self.tk_assets; p=sim.player
+        equip = self.profile.get("equipped", {})
+        # camera follows the drawn (interpolated) player, clamped to the map
+        ww, wh = sim.world; al = self.alpha
+        px = p.px + (p.x - p.px) * al; py = p.py + (p.y - p.py) * al
+        self.set_camera(clamp(px + 32 - WIDTH//2, 0, ww - WIDTH), clamp(py + 40 - HEIGHT//2, 0, wh - HEIGHT), sim.world)
+        # only what is on screen (plus a margin) gets canvas items
+        m = CULL_MARGIN; x0 = self.cam[0] - m; y0 = self.cam[1] - m; x1 = x0 + WIDTH + 2*m; y1 = y0 + HEIGHT + 2*m
+        self.bg.show(c, x0, y0, x1, y1)
+        shown = set()
+        # one frame per clip this frame, off the shared game clock
+        van_img = a['skins'].get("van", equip.get("van", "van_blue"), CLIPS["van"].frame(sim.t))
+        worker_img = a['worker_frames'][CLIPS["worker"].frame(sim.t)]
+        for v in sim.van_grid.in_rect(x0, y0, x1, y1):
+            self.place(v, van_img, "z_actor"); shown.add(v.eid)
+        r = int(p.detect_radius); ring_img = a['rings'].get(r)
+        if ring_img is None: ring_img = a['rings'][r] = pil_to_tk(ring_sprite(r))
+        for w in sim.grid.in_rect(x0, y0, x1, y1):
+            ring = self.rings.get(w.eid)
+            if ring is None: ring = self.rings[w.eid] = SpriteItem()
+            ring.place(c, w.x - r, w.y - r, ring_img, "z_ring")
+            self.place(w, worker_img, "z_actor"); shown.add(w.eid)
+        for eid in self.shown - shown:
+            item = self.items.pop(eid, None)
+            if item is not None: item.delete(c)
+            ring = self.rings.pop(eid, None)
+            if ring is not None: ring.delete(c)
+        self.shown = shown
+        self.place(p, a['skins'].get("alex", equip.get("alex", "alex_grey"), CLIPS["alex"].frame(sim.t)), "z_player")
+        hud = self.hud
+        hud.set("stamina", 12, 12, "Stamina: ", int(sim.player.stamina))
+        hud.set("coins", 12, 34, "Coins: ", self.profile.get('coins',0) + sim.run_coins)
+        hud.set("score", 12, 56, "Score: ", int(sim.player.score))
+        if not sim.van_top.stolen:
+            hud.set("hint", WIDTH//2, 18, MAPS[sim.map]["hint"], anchor="center", fill="#ffd")
 
     def draw_runner(self):
-        c = self.canvas; c.delete("all"); c.image_cache.clear()
-        road_w = 600; left = WIDTH//2 - road_w//2
-        c.create_rectangle(left-8, 0, left+road_w+8, HEIGHT, fill="#333")
-        # lane separators
-        for i in range(LANES+1):
-            x = left + (road_w / LANES) * i
-            c.create_line(x, 0, x, HEIGHT, fill="#222", dash=(6,8))
+        sim=self.sim; a=self.tk_assets; rb = runner_bounds()
+        # lane markings scroll with the interpolated road distance
+        period = sum(ROAD_DASH)
+        off = int(sim.road - sim.scroll_speed * sim.dt * (1 - self.alpha)) % period
+        if off != self.road_off:
+            self.canvas.coords(self.road_item, ROAD_LEFT - 8, off - period); self.road_off = off
         # obstacles
-        for ob in self.obstacles: ob.draw(c)
+        for ob in sim.obstacles: self.place(ob, a['obstacles'][ob.kind], "z_coin", rb[ob.kind])
         # coins
-        for coin in self.coins: coin.draw(c)
+        coin_img = a['coin_frames'][CLIPS["coin"].frame(sim.t)]  # every coin spins in step
+        for coin in sim.coins: self.place(coin, coin_img, "z_van", rb["coin"])
         # van
-        lane_x = left + (road_w // (LANES+1)) * (self.runner_van.lane + 1)
-        self.runner_van.draw(c, lane_x, HEIGHT-120)
-        c.create_text(12, 12, anchor="nw", text=f"Distance: {int(self.runner_score)}", font=FONT, fill="#fff")
-        c.create_text(12, 36, anchor="nw", text=f"Coins: {self.profile.get('coins',0)}", font=FONT, fill="#fff")
-        c.create_text(WIDTH-12, 12, anchor="ne", text=f"Speed: {int(self.scroll_speed)}", font=FONT, fill="#fff")
+        equip = self.profile.get("equipped", {}).get("van", "van_blue")
+        self.place(sim.van, a['skins'].get("van", equip, CLIPS["van"].frame(sim.t)), "z_hud", rb["van"])
+        hud = self.hud
+        hud.set("distance", 12, 12, "Distance: ", int(sim.runner_score))
+        hud.set("coins", 12, 36, "Coins: ", self.profile.get('coins',0) + sim.run_coins)
+        hud.set("speed", WIDTH-12, 12, "Speed: ", int(sim.scroll_speed), anchor="ne")
 
     # ---------- End run ----------
-    def end_run(self, caught=False):
-        total_score = int((self.top_player.score if self.top_player else 0) + self.runner_score)
-        coins_earned = int(total_score // 25) + int(self.runner_score // 100)
-        if "wallet2" in self.profile.get("owned", []): coins_earned *= 2
-        self.profile["coins"] = self.profile.get("coins",0) + coins_earned
+    def end_replay(self):
+        # print the replayed session's frame times next to the recorded ones, then exit
+        self.mode = "gameover"
+        st = self.frame_stats.summary(); old = self.replay.log.get("frames")
+        print(f"replay: {self.sim.ticks} ticks, result {'matches' if self.replay.matches(self.sim) else 'DIFFERS from'} the recording")
+        for name, r in (("recorded", old), ("replayed", st)):
+            if r: print(f"{name:>9}: {r['frames']} frames, p50 {r['p50_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms, "
+                        f"p99 {r['p99_ms']:.1f} ms, {r['missed']} missed deadlines")
+        self.root.after(500, self.quit)
+
+    def end_run(self, result):
+        if self.replay: return self.end_replay()
+        self.save_recording()
+        total_score = result["score"]; coins_earned = result["coins"]
+        self.profile["coins"] = self.profile.get("coins",0) + result["run_coins"] + coins_earned
         self.profile["highscore"] = max(self.profile.get("highscore",0), total_score)
-        self.data["users"][self.current] = self.profile
-        save_users(self.data)
-        self.canvas.delete("all")
-        if caught: self.canvas.create_text(WIDTH//2, HEIGHT//2 - 60, text="CAUGHT! Game Over", font=("Consolas",28), fill="#ff4444")
+        self.store.put(self.current, self.profile)
+        # leave the gameplay modes so the loop stops stepping the finished run
+        self.mode = "gameover"; self.canvas.delete("all"); self.hud.reset(); self.set_camera(0, 0)
+        if result["caught"]: self.canvas.create_text(WIDTH//2, HEIGHT//2 - 60, text="CAUGHT! Game Over", font=("Consolas",28), fill="#ff4444")
         else: self.canvas.create_text(WIDTH//2, HEIGHT//2 - 60, text="CRASH! Run Over", font=("Consolas",28), fill="#ffd166")
         self.canvas.create_text(WIDTH//2, HEIGHT//2 - 10, text=f"Score: {total_score}   Coins: {coins_earned}", font=("Consolas",14), fill="#fff")
         self.canvas.create_text(WIDTH//2, HEIGHT//2 + 40, text=f"Total coins: {self.profile.get('coins',0)}", font=("Consolas",12), fill="#fff")
         play_sound("coin"); # celebratory
+        if self.pacing:
+            st = self.frame_stats.summary()
+            print(f"frame pacing: {st['frames']} frames, p50 {st['p50_ms']:.1f} ms, p95 {st['p95_ms']:.1f} ms, "
+                  f"p99 {st['p99_ms']:.1f} ms, {st['missed']} missed deadlines, {st['catchup_ticks']} catch-up ticks, "
+                  f"{st['tk_calls_per_frame']:.1f} Tk calls/frame")
         self.root.after(1600, lambda: self.show_menu())
 
 # -------------------------
 # Entry point
 # -------------------------
-def main():
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tesco:Alex's Great Adventure")
+    ap.add_argument("--pacing", action="store_true", help="print frame-time percentiles after each run")
+    ap.add_argument("--store", choices=("json", "sqlite"), default="json", help="where accounts are kept")
+    ap.add_argument("--db", default=None, help=f"profile store path (default {USERS_FILE} / {USERS_DB})")
+    ap.add_argument("--migrate-users", metavar="USERS_JSON", help="import a users.json into the SQLite store and exit")
+    ap.add_argument("--overlay", action="store_true", help="start with the F3 profiler overlay shown")
+    ap.add_argument("--trace", metavar="OUT_JSON", help="record timing spans and write a Chrome trace on exit")
+    ap.add_argument("--profile", metavar="OUT_PROF", help="run the session under cProfile and dump stats on exit")
+    ap.add_argument("--map", choices=sorted(MAPS), default="lot", help="top-down map (car_park is a large scrolling one)")
+    ap.add_argument("--hud-rate", type=float, default=HUD_RATE, metavar="HZ", help="HUD text refreshes per second (0 = every frame)")
+    ap.add_argument("--scale", type=float, default=1.0, help=f"initial window size as a multiple of {WIDTH}x{HEIGHT} (resizing the window rescales)")
+    ap.add_argument("--fullscreen", action="store_true", help="start fullscreen (F11 toggles)")
+    ap.add_argument("--record", nargs="?", const=REPLAY_DIR, metavar="DIR", help=f"save an input log per run (default dir {REPLAY_DIR}/)")
+    ap.add_argument("--replay", metavar="LOG", help="play back a recorded run on screen, print frame times, and exit")
+    args = ap.parse_args(argv)
+    if args.migrate_users:
+        n = migrate_users(args.migrate_users, args.db or USERS_DB)
+        print(f"{args.db or USERS_DB}: {n} accounts")
+        return
     root = tk.Tk()
-    app = VanSnatcherApp(root)
+    app = VanSnatcherApp(root, pacing=args.pacing, store=open_profile_store(args.store, args.db),
+                         trace=bool(args.trace), overlay=args.overlay, record=args.record,
+                         replay=InputReplay.load(args.replay) if args.replay else None, world=args.map,
+                         hud_rate=args.hud_rate, scale=fit_scale(WIDTH * args.scale, HEIGHT * args.scale))
+    root.protocol("WM_DELETE_WINDOW", app.quit)
     root.config(bg="#111")
     root.iconphoto(False, PhotoImage(file="Tesco.png"))
-    root.resizable(False, False)
-    root.mainloop()
+    root.minsize(round(WIDTH * SCALE_STEP), round(HEIGHT * SCALE_STEP))
+    if args.fullscreen: root.attributes("-fullscreen", True)
+    if args.profile:
+        import cProfile
+        pr = cProfile.Profile(); pr.enable()
+        try:
+            root.mainloop()
+        finally:
+            pr.disable(); pr.dump_stats(args.profile)
+            print(f"cProfile stats written to {args.profile} (python -m pstats {args.profile})")
+    else:
+        root.mainloop()
+    if args.trace:
+        print(f"{app.prof.dump_trace(args.trace)} spans written to {args.trace}")
 
 if __name__ == "__main__":
     main()
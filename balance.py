@@ -0,0 +1,212 @@
+"""
+# Tesco:Alex's Great Adventure — balance sweeps
+
+Monte Carlo runs of the headless Simulation with scripted policies, spread over
+a process pool on every core. Each run is written to the output as one JSON
+line as soon as its batch comes back, and `summary` streams back over that file
+into running sums and fixed-width histograms, so neither side holds the runs:
+memory follows the range of the values, not the size of the sweep.
+
+Run from the repo root, e.g.:
+    python balance.py run --runs 1000 --out balance.jsonl
+    python balance.py run --runs 200 --policy bot,reckless --loadouts none,sneakers,mask+wallet2 --map car_park --append
+    python balance.py summary balance.jsonl
+
+`run` won't add to an existing file unless given --append, and then reports only
+the runs it just wrote; `summary` covers the whole file (rerunning the same seeds
+into one file counts them twice).
+
+Loadouts are '+'-joined BASE_SHOP ids ("none" = nothing bought); the default is
+every combination. Per loadout the summary shows survival time (whole run and
+the runner phase of runs that stole the van), score and coins earned (score coins + steal bonus + runner pickups) and how many runs it takes
+to earn the loadout's shop cost.
+"""
+
+import os, sys, json, time, random, argparse, itertools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")  # workers import Game: don't open the sound card N times
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import Game
+import bench
+
+BATCH = 25  # runs per pool task: keeps pickling overhead small next to a run
+
+# -------------------------
+# Policies
+# -------------------------
+# policy(seed) -> keys(sim), called before every tick like bench.bot_keys.
+def reckless_keys(sim):
+    # the scripted player for the theft, then never steers in the runner
+    if sim.mode == "topdown": bench.bot_keys(sim)
+
+def random_policy(seed):
+    rng = random.Random(seed ^ 0x5EED)
+    def keys(sim):
+        if rng.random() < 0.05:  # hold a random direction for a while
+            for k in ("left", "right", "up", "down", "sprint"): sim.keys[k] = rng.random() < 0.3
+    return keys
+
+POLICIES = {
+    "bot": lambda seed: bench.bot_keys,
+    "reckless": lambda seed: reckless_keys,
+    "random": random_policy,
+}
+
+def loadouts(spec=None):
+    if spec: return [() if s == "none" else tuple(sorted(s.split("+"))) for s in spec.split(",")]
+    ids = [it["id"] for it in Game.BASE_SHOP]
+    return [c for n in range(len(ids) + 1) for c in itertools.combinations(ids, n)]
+
+def loadout_name(owned):
+    return "+".join(owned) or "none"
+
+def loadout_cost(owned):
+    return sum(it["cost"] for it in Game.BASE_SHOP if it["id"] in owned)
+
+# -------------------------
+# Runs (in the worker processes)
+# -------------------------
+def play(seed, owned, policy, world, max_ticks):
+    sim = Game.Simulation({"owned": list(owned)}, seed=seed, world=world)
+    phase = []
+    sim.on_event = lambda kind, *a: phase.append(sim.ticks) if kind == "phase" else None
+    keys = POLICIES[policy](seed)
+    while sim.mode != "over" and sim.ticks < max_ticks:
+        keys(sim)
+        sim.step()
+    r = sim.result or {}
+    ended = "timeout" if not r else "caught" if r["caught"] else "crash"
+    runner_t = (sim.ticks - phase[0]) * sim.dt if phase else 0.0
+    return {"seed": seed, "loadout": loadout_name(owned), "policy": policy, "map": world,
+            "ended": ended, "stole": bool(phase), "time": round(sim.t, 3), "runner_time": round(runner_t, 3),
+            "score": r.get("score", 0), "coins": r.get("coins", 0) + r.get("run_coins", sim.run_coins)}
+
+def play_batch(job):
+    seeds, owned, policy, world, max_ticks = job
+    return [play(s, owned, policy, world, max_ticks) for s in seeds]
+
+# -------------------------
+# Sweep
+# -------------------------
+def jobs(runs, seed, owned_list, policies, world, max_ticks):
+    for owned in owned_list:
+        for policy in policies:
+            for i in range(0, runs, BATCH):
+                yield (range(seed + i, seed + min(runs, i + BATCH)), owned, policy, world, max_ticks)
+
+def sweep(out, runs=1000, seed=0, owned_list=None, policies=("bot",), world="lot", max_ticks=60 * 60 * 5, workers=None):
+    """Run every (loadout, policy, seed), appending one JSON line per run to `out`. Returns the run count."""
+    owned_list = owned_list if owned_list is not None else loadouts()
+    todo = jobs(runs, seed, owned_list, policies, world, max_ticks)
+    total = runs * len(owned_list) * len(policies); done = 0; t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool, open(out, "a", encoding="utf8") as f:
+        window = 4 * workers  # tasks in flight: bounded, so the job list is never materialised
+        pending = {pool.submit(play_batch, j) for j in itertools.islice(todo, window)}
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                rows = fut.result()
+                for r in rows: f.write(json.dumps(r) + "\n")
+                done += len(rows)
+            f.flush()
+            pending |= {pool.submit(play_batch, j) for j in itertools.islice(todo, len(finished))}
+            el = time.perf_counter() - t0
+            print(f"\r{done}/{total} runs, {done / el:.0f} runs/s", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return done
+
+# -------------------------
+# Summary
+# -------------------------
+class Dist:
+    """Running mean plus a sparse histogram of `width`-wide bins; percentiles are bin centres."""
+    __slots__ = ("width", "bins", "n", "total")
+    def __init__(self, width=1):
+        self.width = width; self.bins = {}; self.n = 0; self.total = 0
+    def add(self, v):
+        b = round(v / self.width)
+        self.bins[b] = self.bins.get(b, 0) + 1; self.n += 1; self.total += v
+    def mean(self):
+        return self.total / self.n if self.n else 0.0
+    def pct(self, q):
+        k = min(self.n - 1, int(q / 100.0 * self.n)); seen = 0
+        for b in sorted(self.bins):
+            seen += self.bins[b]
+            if seen > k: return round(b * self.width, 6)
+        return 0
+
+def summarize(path, start=0):
+    """Distributions per (map, policy, loadout), read back one line at a time from byte offset `start`."""
+    groups = {}
+    with open(path, encoding="utf8") as f:
+        f.seek(start)
+        for line in f:
+            r = json.loads(line)
+            g = groups.get((r["map"], r["policy"], r["loadout"]))
+            if g is None:
+                g = groups[(r["map"], r["policy"], r["loadout"])] = {
+                    "runs": 0, "stole": 0, "caught": 0, "timeout": 0,
+                    "time": Dist(0.1), "runner_time": Dist(0.1), "score": Dist(), "coins": Dist()}
+            g["runs"] += 1; g["stole"] += r["stole"]
+            g["caught"] += r["ended"] == "caught"; g["timeout"] += r["ended"] == "timeout"
+            g["time"].add(r["time"]); g["score"].add(r["score"]); g["coins"].add(r["coins"])
+            if r["stole"]: g["runner_time"].add(r["runner_time"])
+    out = {}
+    for key, g in sorted(groups.items()):
+        coins = g["coins"].mean(); cost = loadout_cost(key[2].split("+") if key[2] != "none" else ())
+        t = g["time"]; rt = g["runner_time"]
+        out[key] = {"runs": g["runs"], "stole_pct": 100.0 * g["stole"] / g["runs"],
+                    "caught_pct": 100.0 * g["caught"] / g["runs"], "timeout_pct": 100.0 * g["timeout"] / g["runs"],
+                    "time_p10": t.pct(10), "time_p50": t.pct(50), "time_p90": t.pct(90),
+                    "runner_p10": rt.pct(10), "runner_p50": rt.pct(50), "runner_p90": rt.pct(90),
+                    "score_p50": g["score"].pct(50), "score_mean": g["score"].mean(),
+                    "coins_p50": g["coins"].pct(50), "coins_mean": coins,
+                    "cost": cost, "runs_to_afford": cost / coins if coins else float("inf")}
+    return out
+
+def report(summary):
+    print(f"{'map':<9} {'policy':<9} {'loadout':<23} {'runs':>6} {'stole':>6} {'caught':>7} "
+          f"{'time p10/p50/p90 s':>19} {'runner p10/p50/p90 s':>21} {'score p50':>9} {'coins p50/mean':>15} {'cost':>5} {'runs/cost':>9}")
+    for (world, policy, owned), s in summary.items():
+        print(f"{world:<9} {policy:<9} {owned:<23} {s['runs']:>6} {s['stole_pct']:>5.0f}% {s['caught_pct']:>6.0f}% "
+              f"{s['time_p10']:>6.1f}/{s['time_p50']:>5.1f}/{s['time_p90']:>5.1f} "
+              f"{s['runner_p10']:>8.1f}/{s['runner_p50']:>5.1f}/{s['runner_p90']:>5.1f} {s['score_p50']:>9} "
+              f"{s['coins_p50']:>6}/{s['coins_mean']:>8.1f} {s['cost']:>5} {s['runs_to_afford']:>9.1f}")
+
+# -------------------------
+# Entry point
+# -------------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("run", help="sweep seeds x loadouts x policies, appending JSON lines, then summarise")
+    p.add_argument("--out", default="balance.jsonl", help="JSON-lines file to write")
+    p.add_argument("--append", action="store_true", help="add to an existing --out file (the report still covers only this sweep)")
+    p.add_argument("--runs", type=int, default=1000, help="seeds per loadout and policy")
+    p.add_argument("--seed", type=int, default=0, help="first seed")
+    p.add_argument("--loadouts", help="comma-separated, e.g. none,sneakers,mask+wallet2 (default: every combination)")
+    p.add_argument("--policy", default="bot", help="comma-separated subset of: " + ",".join(POLICIES))
+    p.add_argument("--map", choices=sorted(Game.MAPS), default="lot")
+    p.add_argument("--minutes", type=float, default=5.0, help="game-time limit per run")
+    p.add_argument("--workers", type=int, help="processes (default: one per core)")
+    p = sub.add_parser("summary", help="summarise an existing JSON-lines file")
+    p.add_argument("path")
+    args = ap.parse_args(argv)
+    if args.cmd == "run":
+        policies = args.policy.split(",")
+        for name in policies:
+            if name not in POLICIES: ap.error(f"unknown policy {name!r}")
+        start = os.path.getsize(args.out) if os.path.exists(args.out) else 0
+        if start and not args.append: ap.error(f"{args.out} already has runs: pass --append, or pick another --out")
+        n = sweep(args.out, args.runs, args.seed, loadouts(args.loadouts), policies, args.map,
+                  int(args.minutes * 60 / Game.TICK), args.workers)
+        print(f"{n} runs written to {args.out}")
+        report(summarize(args.out, start))
+    elif args.cmd == "summary":
+        report(summarize(args.path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,778 @@
+"""
+# Tesco:Alex's Great Adventure — benchmarks
+
+Run from the repo root, e.g.:
+    python bench.py startup
+    python bench.py sim --runs 500
+    python bench.py topdown --workers 4,50,200,500
+    python bench.py world
+    python bench.py chase --workers 10,50,200
+    python bench.py store --counts 10,100,1000
+    python bench.py alloc --minutes 10
+    python bench.py collide --seeds 20
+    python bench.py save --users 1000
+    python bench.py login --iterations 150000,600000
+    python bench.py sound
+    python bench.py suite --out bench_results.json [--compare old.json]
+    python bench.py record replays/bot.json --seed 3
+    python bench.py replay replays/run-20250101-120000.json --repeat 5
+    python bench.py chunks --seeds 100 --minutes 3
+"""
+
+import os, sys, json, time, shutil, platform, tempfile, argparse, subprocess, statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import Game
+
+# -------------------------
+# Startup
+# -------------------------
+_STARTUP_PROBE = """
+import time
+t0 = time.perf_counter()
+import Game
+t1 = time.perf_counter()
+Game.load_sprites({cache_dir!r})
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+def _startup_once(cache_dir):
+    # fresh interpreter each time so nothing is memoised between runs
+    out = subprocess.check_output([sys.executable, "-c", _STARTUP_PROBE.format(cache_dir=cache_dir)], cwd=HERE)
+    imp, load = map(float, out.split()[-2:])
+    return imp, load
+
+def bench_startup(runs=5):
+    cold = []; warm = []
+    for _ in range(runs):
+        d = tempfile.mkdtemp(prefix="vn_sprites_")
+        try:
+            cold.append(_startup_once(d))   # empty cache dir: generate + write sheet
+            warm.append(_startup_once(d))   # sheet present: single PNG load
+        finally:
+            shutil.rmtree(d, ignore_errors=True)
+    res = {}
+    for name, rows in (("cold", cold), ("warm", warm)):
+        res[name] = {
+            "import_ms": statistics.median(r[0] for r in rows) * 1000,
+            "sprites_ms": statistics.median(r[1] for r in rows) * 1000,
+        }
+    return res
+
+def report_startup(res):
+    print(f"{'cache':<6} {'import ms':>10} {'sprites ms':>11} {'total ms':>9}")
+    for name in ("cold", "warm"):
+        r = res[name]
+        print(f"{name:<6} {r['import_ms']:>10.1f} {r['sprites_ms']:>11.1f} {r['import_ms'] + r['sprites_ms']:>9.1f}")
+    saved = res["cold"]["sprites_ms"] - res["warm"]["sprites_ms"]
+    print(f"warm cache saves {saved:.1f} ms of sprite generation")
+
+# -------------------------
+# Headless simulation
+# -------------------------
+def bot_keys(sim):
+    """Simple scripted player: walk to the van, then dodge obstacles in the runner."""
+    k = sim.keys
+    if sim.mode == "topdown":
+        p = sim.player
+        v = min((v for v in sim.vans if not v.stolen), key=lambda v: (v.x - p.x) ** 2 + (v.y - p.y) ** 2)
+        tx, ty = v.x, v.y
+        if sim.nav: tx, ty = sim.nav.waypoints(p.x, p.y, tx, ty)[0]  # around the planters
+        # head for the nearest van, pushed away from any worker closing in
+        dx = tx - p.x; dy = ty - p.y
+        n = max(1.0, (dx*dx + dy*dy) ** 0.5); dx /= n; dy /= n
+        for w in sim.workers:
+            wx = p.x - w.x; wy = p.y - w.y; d = max(1.0, (wx*wx + wy*wy) ** 0.5)
+            if d < p.detect_radius * 1.6:
+                dx += 1.5 * wx / d; dy += 1.5 * wy / d
+        k["right"] = dx > 0.3; k["left"] = dx < -0.3
+        k["down"] = dy > 0.3; k["up"] = dy < -0.3
+        k["sprint"] = p.stamina > 30
+    elif sim.mode == "runner":
+        lane = sim.van.lane
+        def blocked(l):
+            return sim.obstacles.blocked(l, -40, sim.van.y)
+        if blocked(lane):
+            for l in (lane - 1, lane + 1):
+                if 0 <= l < Game.LANES and not blocked(l):
+                    k["left" if l < lane else "right"] = True
+                    break
+
+def run_headless(seed, profile=None, max_ticks=60 * 60 * 2, policy=bot_keys, vectorized=False):
+    sim = Game.Simulation(profile or {"owned": []}, seed=seed, vectorized=vectorized)
+    while sim.mode != "over" and sim.ticks < max_ticks:
+        policy(sim)
+        sim.step()
+    return sim
+
+def bench_sim(runs=200, seed=0, vectorized=False):
+    t0 = time.perf_counter(); ticks = 0; scores = []; timeouts = 0
+    for i in range(runs):
+        sim = run_headless(seed + i, vectorized=vectorized)
+        ticks += sim.ticks
+        if sim.result: scores.append(sim.result["score"])
+        else: timeouts += 1
+    el = time.perf_counter() - t0
+    return {"runs": runs, "seconds": el, "runs_per_s": runs / el, "ticks_per_s": ticks / el,
+            "mean_ticks": ticks / runs, "median_score": statistics.median(scores) if scores else 0,
+            "timeouts": timeouts}
+
+def bench_topdown(counts=(4, 50, 200, 500), ticks=600, seed=0):
+    """Per-tick cost of Simulation.update_topdown with a crowd of patrolling workers."""
+    out = {}
+    for n in counts:
+        sim = Game.Simulation({"owned": []}, seed=seed, workers=n)
+        sim.keys.update(right=True, down=True)  # fixed input: the bot itself is O(workers)
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            sim.update_topdown(Game.TICK)  # keeps stepping even after a catch, so every tick costs the same
+        out[n] = (time.perf_counter() - t0) / ticks * 1e6
+    return out
+
+def bench_world(maps=None, ticks=600, seed=0):
+    """Top-down tick cost per map, and what the frontend's viewport culling leaves to draw."""
+    out = {}
+    for name in maps or Game.MAPS:
+        sim = Game.Simulation({"owned": []}, seed=seed, world=name); p = sim.player
+        ww, wh = sim.world; m = Game.CULL_MARGIN
+        t_tick = t_cull = 0.0; seen = 0
+        for _ in range(ticks):
+            bot_keys(sim)
+            t0 = time.perf_counter(); sim.update_topdown(Game.TICK); t1 = time.perf_counter()
+            # same rectangle draw_topdown asks for
+            cx = Game.clamp(p.x + 32 - Game.WIDTH // 2, 0, ww - Game.WIDTH)
+            cy = Game.clamp(p.y + 40 - Game.HEIGHT // 2, 0, wh - Game.HEIGHT)
+            box = (cx - m, cy - m, cx + Game.WIDTH + m, cy + Game.HEIGHT + m)
+            n = len(sim.grid.in_rect(*box)) + len(sim.van_grid.in_rect(*box))
+            t_cull += time.perf_counter() - t1; t_tick += t1 - t0; seen += n
+            if sim.mode != "topdown":
+                sim = Game.Simulation({"owned": []}, seed=seed, world=name); p = sim.player
+        out[name] = {"size": sim.world, "entities": len(sim.workers) + len(sim.vans),
+                     "tick_us": t_tick / ticks * 1e6, "cull_us": t_cull / ticks * 1e6, "visible": seen / ticks}
+    return out
+
+def bench_chase(counts=(10, 50, 200), ticks=300, seed=0):
+    """Car-park crowd chasing a player who walks behind planters: the shared flow field
+    vs an A* per chaser per tick (timed on a sample of ticks)."""
+    out = {}
+    for n in counts:
+        sim = Game.Simulation({"owned": []}, seed=seed, world="car_park", workers=0)
+        nav = sim.nav; p = sim.player; rng = sim.rng
+        p.x, p.y = nav.snap(1400, 1200)
+        for _ in range(n):
+            x, y = nav.snap(p.x + rng.randint(-380, 380), p.y + rng.randint(-280, 280))
+            sim.workers.append(sim.tag(Game.TopWorker(x, y, rng, sim.world, nav)))
+        sim.keys.update(down=True)  # down through a planter row, then along the bottom kerb
+        nav.searches = 0; t_flow = t_astar = 0.0; sampled = 0
+        for t in range(ticks):
+            for w in sim.workers: w.chasing = True
+            t0 = time.perf_counter()
+            p.update(Game.TICK, sim.keys)
+            flow = nav.flow(nav.cell(p.x, p.y))
+            for w in sim.workers: w.update(Game.TICK, p, flow)
+            t_flow += time.perf_counter() - t0
+            if t % 30 == 0:  # what a fresh per-worker search would have cost this tick
+                goal = nav.cell(p.x, p.y); t0 = time.perf_counter()
+                for w in sim.workers: nav.search(nav.cell(w.x, w.y), goal)
+                t_astar += time.perf_counter() - t0; sampled += 1; nav.searches -= n
+        out[n] = {"flow_us": t_flow / ticks * 1e6, "astar_us": t_astar / sampled * 1e6, "field_builds": nav.searches}
+    return out
+
+# -------------------------
+# Runner entity stores
+# -------------------------
+def _store_tick_cost(make, n, ticks, seed):
+    rng = Game.random.Random(seed)
+    gone = [0]
+    def on_despawn(eid): gone[0] += 1
+    obstacles = make("obstacle", on_despawn); coins = make("coin", on_despawn)
+    span = Game.HEIGHT + 420
+    # bottom to top, the order the road spawns in
+    for i in range(n):
+        lane = rng.randrange(Game.LANES)
+        obstacles.spawn(i, lane, rng.choice(("worker", "cone", "crate")), Game.LANE_XS[lane], Game.HEIGHT + 220 - span * i / n)
+    for i, y in enumerate(sorted((-200 + span * rng.random() for _ in range(n)), reverse=True)):
+        lane = rng.randrange(Game.LANES)
+        coins.spawn(n + i, lane, "coin", Game.LANE_XS[lane], y)
+    van = Game.RunnerVan(); van.set_position(Game.LANE_XS[1], Game.VAN_BASE_Y); box = van.bbox()
+    eid = 2 * n
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        gone[0] = 0
+        obstacles.advance(Game.TICK, 400.0, Game.HEIGHT + 220)
+        coins.advance(Game.TICK, 400.0, Game.HEIGHT + 200)
+        obstacles.first_hit(box, 1)
+        coins.collect(box, 1)
+        # keep the live count constant: respawn whatever left at the top
+        for _ in range(gone[0]):
+            lane = rng.randrange(Game.LANES)
+            store = coins if len(coins) < n else obstacles
+            store.spawn(eid, lane, "coin" if store is coins else "cone", Game.LANE_XS[lane], -200); eid += 1
+    return (time.perf_counter() - t0) / ticks * 1e6
+
+def bench_store(counts=(10, 100, 1000), ticks=600, seed=0):
+    """Per-tick cost of move + cull + van overlap for list vs NumPy runner stores."""
+    def make_list(family, on_despawn):
+        return Game.RunnerList(Game.Coin if family == "coin" else Game.RunnerObstacle, on_despawn)
+    def make_arrays(family, on_despawn):
+        return Game.RunnerArrays(on_despawn)
+    out = {}
+    for n in counts:
+        out[n] = {"list_us": _store_tick_cost(make_list, n, ticks, seed)}
+        if Game.HAVE_NUMPY: out[n]["numpy_us"] = _store_tick_cost(make_arrays, n, ticks, seed)
+    return out
+
+# -------------------------
+# Persistence
+# -------------------------
+def _fake_users(n, seed=0):
+    rng = Game.random.Random(seed)
+    users = {}
+    for i in range(n):
+        users[f"user{i}"] = {"pw_hash": "%064x" % rng.getrandbits(256), "pw_salt": "%032x" % rng.getrandbits(128),
+                             "coins": rng.randint(0, 5000), "highscore": rng.randint(0, 20000),
+                             "owned": rng.sample([it["id"] for it in Game.SHOP_ITEMS], 3),
+                             "equipped": {"alex": "alex_grey", "van": "van_blue"}, "multiplier": 1.0, "session_active": False}
+    return {"users": users, "current_user": "user0"}
+
+def bench_save(users=1000, saves=50):
+    """Main-thread cost of persisting one run end: old blocking indent=2 dump vs SaveWorker.save()."""
+    import json
+    data = _fake_users(users)
+    d = tempfile.mkdtemp(prefix="vn_users_")
+    try:
+        path = os.path.join(d, "users.json")
+        t0 = time.perf_counter()
+        for i in range(saves):
+            data["users"]["user0"]["coins"] += 1
+            with open(path, "w", encoding="utf8") as f: json.dump(data, f, indent=2)  # pre-SaveWorker behaviour
+        sync_ms = (time.perf_counter() - t0) / saves * 1000
+        t0 = time.perf_counter()
+        for i in range(saves):
+            data["users"]["user0"]["coins"] += 1
+            Game.save_users(data, path)
+        atomic_ms = (time.perf_counter() - t0) / saves * 1000
+        saver = Game.SaveWorker(path, delay=0.05); saver.prime(data)
+        for i in range(saves):
+            data["users"]["user0"]["coins"] += 1
+            saver.save(data, ["user0"])
+        saver.flush()
+        with open(path, encoding="utf8") as f: ok = json.load(f)["users"]["user0"]["coins"] == data["users"]["user0"]["coins"]
+        st = saver.stats()
+        # SQLite store: migrate the same accounts, then time one-row lookups and upserts
+        db = os.path.join(d, "users.db")
+        migrated = Game.migrate_users(path, db)
+        store = Game.SqliteProfileStore(db)
+        try:
+            t0 = time.perf_counter()
+            for i in range(saves): p = store.get("user%d" % (i * 7 % users))
+            get_ms = (time.perf_counter() - t0) / saves * 1000
+            t0 = time.perf_counter()
+            for i in range(saves):
+                p["coins"] += 1; store.put("user0", p)
+            put_ms = (time.perf_counter() - t0) / saves * 1000
+            ok = ok and migrated == users and store.get("user0")["coins"] == p["coins"]
+        finally:
+            store.close()
+        return {"users": users, "blocking_indent_ms": sync_ms, "blocking_atomic_ms": atomic_ms,
+                "async_p50_ms": st["p50_ms"], "async_max_ms": st["max_ms"], "requests": st["requests"],
+                "writes": st["writes"], "sqlite_get_ms": get_ms, "sqlite_put_ms": put_ms, "file_ok": ok}
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+# -------------------------
+# Login latency
+# -------------------------
+def bench_login(iterations=150000, logins=5):
+    """Login latency with the hash on the KDF thread while a 60 Hz frame loop keeps running.
+
+    `blocking_ms` is the old freeze (verify on the Tk thread). For the async path
+    the main thread sleeps to each frame deadline and polls, like VanSnatcherApp.loop;
+    `max_gap_ms` is the longest stretch between frames during a login.
+    """
+    h, salt = Game.hash_password("hunter2", iterations=iterations)
+    t0 = time.perf_counter()
+    for _ in range(logins): Game.verify_password(h, salt, "hunter2", iterations)
+    blocking = (time.perf_counter() - t0) / logins
+    kdf = Game.KdfWorker(); lat = []; gaps = []; ok = True
+    try:
+        for _ in range(logins):
+            done = []
+            t0 = last = time.perf_counter()
+            kdf.submit(Game.verify_password, (h, salt, "hunter2", iterations), done.append)
+            while not done:
+                time.sleep(max(0.0, last + Game.TICK - time.perf_counter()))
+                now = time.perf_counter(); gaps.append(now - last); last = now
+                kdf.poll()
+            lat.append(now - t0); ok = ok and done[0]
+    finally:
+        kdf.shutdown()
+    return {"iterations": iterations, "blocking_ms": blocking * 1000, "async_ms": statistics.median(lat) * 1000,
+            "max_gap_ms": max(gaps) * 1000, "frames": len(gaps), "ok": ok}
+
+# -------------------------
+# Sound
+# -------------------------
+def _old_synth_wav(f, freq=440, ms=120, vol=0.12):
+    # the pre-SoundBank generator: one struct.pack + writeframes per sample
+    import wave, struct, math
+    sr = 22050
+    n = int(sr * ms / 1000.0)
+    with wave.open(f, "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(sr)
+        max_a = int(32767 * vol)
+        for i in range(n):
+            s = int(max_a * math.sin(2 * math.pi * freq * (i / sr)))
+            wf.writeframes(struct.pack("<h", s))
+
+def bench_sound(triggers=2000, reps=5):
+    """Startup cost of building every effect, and the per-trigger cost of play_sound()."""
+    import io
+    def best(fn):
+        out = []
+        for _ in range(reps):
+            t0 = time.perf_counter(); fn(); out.append(time.perf_counter() - t0)
+        return min(out) * 1000
+    specs = Game.SOUND_SPECS.values()
+    old_ms = best(lambda: [_old_synth_wav(io.BytesIO(), f, ms) for f, ms in specs])
+    new_ms = best(lambda: [Game.synth_tone(f, ms) for f, ms in specs])
+    have_np = Game.HAVE_NUMPY
+    Game.HAVE_NUMPY = False
+    try:
+        py_ms = best(lambda: [Game.synth_tone(f, ms) for f, ms in specs])
+    finally:
+        Game.HAVE_NUMPY = have_np
+    bank = Game.SoundBank()
+    bank.min_gap = {}  # time the play path itself, not the throttle
+    t0 = time.perf_counter()
+    for i in range(triggers): bank.play("crash" if i % 10 == 0 else "coin")
+    play_us = (time.perf_counter() - t0) / triggers * 1e6
+    # a burst of 12 coins inside one frame should be heard once
+    burst = Game.SoundBank()
+    for _ in range(12): burst.play("coin")
+    return {"mixer": "pygame" if bank.enabled else "none", "old_synth_ms": old_ms, "synth_ms": new_ms,
+            "synth_pure_ms": py_ms, "bank_build_ms": bank.build_ms, "play_us": play_us,
+            "burst_played": burst.plays, "burst_throttled": burst.throttled}
+
+# -------------------------
+# Collision stress
+# -------------------------
+def check_collide(speeds=(220, 2000, 20000, 200000), dts=(Game.TICK, 1 / 30, 0.25), seeds=20):
+    """Runner held at extreme scroll speeds and tick lengths, with a van that never steers.
+
+    Every run has to end on an obstacle in the van's lane, and no obstacle or coin in
+    that lane may ever be found fully below the van while the run goes on (tunnelled).
+    Also counts the crashes a point-in-time overlap test would have missed.
+    """
+    rows = []
+    for vec in (False, True) if Game.HAVE_NUMPY else (False,):
+        for speed in speeds:
+            for dt in dts:
+                r = {"store": "numpy" if vec else "list", "speed": speed, "dt": dt,
+                     "crashes": 0, "tunnelled": 0, "point_test_missed": 0}
+                for seed in range(seeds):
+                    sim = Game.Simulation({"owned": []}, seed=seed, dt=dt, vectorized=vec); sim.start_runner()
+                    van = sim.van; passed = set()
+                    for _ in range(100000):
+                        sim.scroll_speed = speed  # hold it: update_runner would keep ramping
+                        sim.step()
+                        x1, y1, x2, y2 = van.bbox()
+                        if sim.mode == "over":
+                            r["crashes"] += 1
+                            if not any(o.lane == van.lane and o.y <= y2 and o.y + Game.runner_bounds()[o.kind][3] >= y1
+                                       for o in sim.obstacles):
+                                r["point_test_missed"] += 1
+                            break
+                        for store in (sim.obstacles, sim.coins):
+                            for o in store:
+                                if o.lane == van.lane and o.y > y2: passed.add(o.eid)
+                    r["tunnelled"] += len(passed)
+                rows.append(r)
+    return all(r["crashes"] == seeds and not r["tunnelled"] for r in rows), rows
+
+# -------------------------
+# Allocation check
+# -------------------------
+def check_alloc(minutes=10.0, warmup=60.0, seed=0, slack_kb=16.0):
+    """Run the runner phase for `minutes` of game time and compare traced memory after warm-up.
+
+    Crashes are ignored (update_runner keeps being called), so the store sees a
+    long steady stream of spawns and despawns. Returns (ok, report dict).
+    """
+    import tracemalloc
+    sim = Game.Simulation({"owned": []}, seed=seed)
+    sim.start_runner()
+    def step(seconds):
+        for i in range(int(seconds / Game.TICK)):
+            if i % 40 == 0: sim.keys["left" if (i // 40) % 2 else "right"] = True
+            sim.update_runner(Game.TICK)
+    step(warmup)  # fill the free lists
+    tracemalloc.start()
+    created0 = sim.obstacles.created + sim.coins.created
+    before = tracemalloc.take_snapshot()
+    step(minutes * 60)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(st.size_diff for st in after.compare_to(before, "filename"))
+    created = sim.obstacles.created + sim.coins.created - created0
+    rep = {"sim_minutes": minutes, "growth_kb": growth / 1024, "entities_created": created,
+           "live": len(sim.obstacles) + len(sim.coins), "pooled": len(sim.obstacles.free) + len(sim.coins.free)}
+    return growth / 1024 <= slack_kb and created == 0, rep
+
+# -------------------------
+# Runner chunks
+# -------------------------
+def check_road(seed, minutes=3.0):
+    """Drive the runner road for `minutes` and search for a way through it using the real hitboxes.
+
+    The searching player may change one lane per LANE_SHIFT_GAP px of scrolled road,
+    which is the reaction budget build_chunk promises. Returns the road px at which
+    every lane was blocked, or None if the whole stretch can be survived.
+    """
+    sim = Game.Simulation({"owned": []}, seed=seed); _quiet(sim)
+    sim.start_runner()
+    boxes = []
+    for lane in range(Game.LANES):
+        van = Game.RunnerVan(); van.set_position(Game.LANE_XS[lane], Game.VAN_BASE_Y); boxes.append(van.bbox())
+    best = {lane: float("-inf") for lane in range(Game.LANES)}  # lane -> road px of the last lane change
+    for _ in range(int(minutes * 60 / Game.TICK)):
+        sim.update_runner(Game.TICK)
+        road = sim.road; nxt = dict(best)
+        for lane, last in best.items():
+            if road - last >= Game.LANE_SHIFT_GAP:
+                for l in (lane - 1, lane + 1):
+                    if 0 <= l < Game.LANES and l not in best: nxt[l] = road
+        blocked = {l for l in range(Game.LANES) if sim.obstacles.first_hit(boxes[l], l)}
+        best = {l: t for l, t in nxt.items() if l not in blocked}
+        if not best: return road
+    return None
+
+def bench_chunks(seeds=100, minutes=3.0, builds=2000):
+    t0 = time.perf_counter(); n = 0
+    for i in range(builds):
+        speed = 220.0 + (i % 300) * 6.0
+        entries, _, _, _ = Game.build_chunk(0, i, 0.0, speed, set(range(Game.LANES)), None); n += len(entries)
+    build_us = (time.perf_counter() - t0) / builds * 1e6
+    stuck = {}
+    for seed in range(seeds):
+        at = check_road(seed, minutes)
+        if at is not None: stuck[seed] = at
+    return {"build_us": build_us, "entries_per_chunk": n / builds, "seeds": seeds, "minutes": minutes, "unsolvable": stuck}
+
+# -------------------------
+# Input logs
+# -------------------------
+def record_bot(path, seed=0, max_ticks=7200):
+    """Record one scripted-bot run as an input log (same format as `Game.py --record`)."""
+    sim = Game.Simulation({"owned": []}, seed=seed)
+    rec = Game.InputRecorder(sim)
+    while sim.mode != "over" and sim.ticks < max_ticks:
+        bot_keys(sim)
+        sim.step()
+    return rec.save(path, sim), sim
+
+def bench_replay(path, repeat=5):
+    """Replay a log headless as fast as possible; every repeat must reproduce the recorded result."""
+    rp = Game.InputReplay.load(path)
+    samples = []; ok = True; runs = []
+    for _ in range(repeat):
+        sim = rp.make_sim(); clock = time.perf_counter
+        t0 = clock()
+        while not rp.finished(sim):
+            t = clock(); sim.step(); samples.append(clock() - t)
+        runs.append(clock() - t0); ok = ok and rp.matches(sim)
+    ticks = rp.log["ticks"]
+    return dict(_per_call(samples), ticks=ticks, result=rp.log["result"], deterministic=ok,
+                speedup=ticks * rp.log["dt"] / statistics.median(runs), recorded_frames=rp.log.get("frames"))
+
+# -------------------------
+# Suite: seeded scenarios -> JSON
+# -------------------------
+def _per_call(samples):
+    s = sorted(samples)
+    return {"calls": len(s), "mean_us": statistics.fmean(s) * 1e6, "p50_us": s[len(s)//2] * 1e6,
+            "p95_us": s[int(len(s) * 0.95)] * 1e6, "max_us": s[-1] * 1e6}
+
+def _quiet(sim):
+    # keep a scenario running through catches and crashes: drop over/sound events
+    forward = sim.on_event or (lambda kind, *a: None)
+    sim.on_event = lambda kind, *a: None if kind in ("over", "sound") else forward(kind, *a)
+
+def scenario_topdown(seed, seconds=60.0, workers=50):
+    """update_topdown with 50 patrolling workers and a scripted player."""
+    sim = Game.Simulation({"owned": []}, seed=seed, workers=workers)
+    sim.keys.update(right=True, down=True)
+    tick = sim.update_topdown; clock = time.perf_counter; samples = []
+    for _ in range(int(seconds / Game.TICK)):
+        t0 = clock(); tick(Game.TICK); samples.append(clock() - t0)
+    return dict(_per_call(samples), workers=workers, game_seconds=seconds)
+
+def scenario_runner(seed, seconds=300.0):
+    """update_runner for 5 minutes of game time; scroll speed ramps up the whole way."""
+    sim = Game.Simulation({"owned": []}, seed=seed); _quiet(sim)
+    sim.start_runner(); v0 = sim.scroll_speed
+    tick = sim.update_runner; clock = time.perf_counter; samples = []
+    for i in range(int(seconds / Game.TICK)):
+        if i % 40 == 0: sim.keys["left" if (i // 40) % 2 else "right"] = True
+        t0 = clock(); tick(Game.TICK); samples.append(clock() - t0)
+    return dict(_per_call(samples), game_seconds=seconds, speed_start=v0, speed_end=sim.scroll_speed)
+
+def _tk_app(tmp):
+    # a real (withdrawn) Tk window; needs a display, e.g. `xvfb-run python bench.py suite`
+    root = Game.tk.Tk(); root.withdraw()
+    app = Game.VanSnatcherApp(root, store=Game.JsonProfileStore(os.path.join(tmp, "users.json")))
+    app.current = "bench"; app.profile = {"coins": 0, "owned": [], "equipped": {"alex": "alex_grey", "van": "van_blue"}}
+    app.refresh_skins()
+    return root, app
+
+def _draw_samples(root, app, update, draw, seconds):
+    clock = time.perf_counter; samples = []; app.tk_calls.take()
+    for _ in range(int(seconds / Game.TICK)):
+        update(Game.TICK)
+        t0 = clock(); app.hud.frame(t0); draw(); root.update_idletasks(); samples.append(clock() - t0)  # idletasks = the redraw
+    return samples, app.tk_calls.take() / len(samples)
+
+def scenario_draw(seed, seconds=30.0, workers=50):
+    """draw_topdown (50 workers) and draw_runner against a real Tk canvas, including the redraw."""
+    tmp = tempfile.mkdtemp(prefix="vn_bench_")
+    try:
+        root, app = _tk_app(tmp)
+    except Exception as e:  # TclError: no display
+        shutil.rmtree(tmp, ignore_errors=True)
+        return {"skipped": f"no Tk display ({e.__class__.__name__}); run under xvfb-run"}
+    try:
+        app.start_topdown()
+        sim = app.sim = Game.Simulation(app.profile, seed=seed, workers=workers)
+        sim.on_event = app.on_sim_event; _quiet(sim)
+        sim.keys.update(right=True, down=True)
+        top, top_calls = _draw_samples(root, app, sim.update_topdown, app.draw_topdown, seconds)
+        sim.start_runner()  # emits "phase" -> app.start_runner()
+        run, run_calls = _draw_samples(root, app, sim.update_runner, app.draw_runner, seconds)
+        return {"draw_topdown": dict(_per_call(top), workers=workers, tk_calls_per_frame=top_calls),
+                "draw_runner": dict(_per_call(run), tk_calls_per_frame=run_calls),
+                "canvas_items": len(app.canvas.find_all())}
+    finally:
+        app.kdf.shutdown(); root.destroy(); shutil.rmtree(tmp, ignore_errors=True)
+
+def scenario_sprites(seed, reps=3):
+    """load_sprites from an empty cache dir (generate + write sheet) and from a warm one."""
+    cold = []; warm = []
+    for _ in range(reps):
+        d = tempfile.mkdtemp(prefix="vn_sprites_")
+        try:
+            for out in (cold, warm):
+                Game._sprites.clear()
+                t0 = time.perf_counter(); Game.load_sprites(d); out.append(time.perf_counter() - t0)
+        finally:
+            shutil.rmtree(d, ignore_errors=True)
+    Game._sprites.clear()
+    return {"cold_ms": min(cold) * 1000, "warm_ms": min(warm) * 1000}
+
+def scenario_save(seed, users=1000, saves=20):
+    """save_users (blocking atomic write) and SaveWorker.save (main-thread share) with 1000 accounts."""
+    data = _fake_users(users, seed)
+    d = tempfile.mkdtemp(prefix="vn_users_")
+    try:
+        path = os.path.join(d, "users.json"); blocking = []
+        for _ in range(saves):
+            data["users"]["user0"]["coins"] += 1
+            t0 = time.perf_counter(); Game.save_users(data, path); blocking.append(time.perf_counter() - t0)
+        saver = Game.SaveWorker(path); saver.prime(data)
+        for _ in range(saves):
+            data["users"]["user0"]["coins"] += 1; saver.save(data, ["user0"])
+        saver.flush()
+        return {"users": users, "save_users_ms": statistics.median(blocking) * 1000,
+                "saveworker_p50_ms": saver.stats()["p50_ms"]}
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+def scenario_hash(seed, reps=5):
+    """hash_password at the current PBKDF2 work factor."""
+    out = []
+    for i in range(reps):
+        t0 = time.perf_counter(); Game.hash_password("bench%d" % i); out.append(time.perf_counter() - t0)
+    return {"iterations": Game.PBKDF2_ITERATIONS, "median_ms": statistics.median(out) * 1000}
+
+SCENARIOS = {
+    "topdown_50_workers": scenario_topdown,
+    "runner_5min_ramp": scenario_runner,
+    "draw": scenario_draw,
+    "sprites": scenario_sprites,
+    "save_users": scenario_save,
+    "hash_password": scenario_hash,
+}
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def run_suite(names=None, seed=0):
+    res = {"meta": {"commit": _git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                    "numpy": Game.HAVE_NUMPY, "seed": seed, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+           "scenarios": {}}
+    for name in names or SCENARIOS:
+        t0 = time.perf_counter()
+        res["scenarios"][name] = SCENARIOS[name](seed)
+        print(f"  {name}: {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return res
+
+def _flatten(d, prefix=""):
+    for k, v in d.items():
+        if isinstance(v, dict): yield from _flatten(v, prefix + k + ".")
+        elif isinstance(v, (int, float)) and not isinstance(v, bool) and k.endswith(("_us", "_ms")): yield prefix + k, v
+
+def compare(old, new, threshold=20.0):
+    """Print every timing present in both runs; flag changes beyond `threshold` percent. Returns the regression count."""
+    before = dict(_flatten(old["scenarios"])); regressions = 0
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for key, v in _flatten(new["scenarios"]):
+        if key not in before or not before[key]: continue
+        pct = (v - before[key]) / before[key] * 100
+        noisy = key.endswith(("max_us", "mean_us"))  # dragged around by single GC/scheduler stalls: shown only
+        flag = "" if noisy else "  REGRESSION" if pct > threshold else ("  faster" if pct < -threshold else "")
+        regressions += pct > threshold and not noisy
+        print(f"{key:<40} {before[key]:>10.2f} {v:>10.2f} {pct:+7.1f}%{flag}")
+    return regressions
+
+# -------------------------
+# Entry point
+# -------------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("startup", help="cold vs warm sprite-cache startup time")
+    p.add_argument("--runs", type=int, default=5)
+    p = sub.add_parser("sim", help="headless Simulation throughput with a scripted bot")
+    p.add_argument("--runs", type=int, default=200)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--numpy", action="store_true", help="use the NumPy runner store")
+    p = sub.add_parser("topdown", help="update_topdown cost per tick vs worker count")
+    p.add_argument("--workers", default="4,50,200,500")
+    p.add_argument("--ticks", type=int, default=600)
+    p = sub.add_parser("world", help="top-down tick cost and viewport-culled entity counts per map")
+    p.add_argument("--ticks", type=int, default=600)
+    p = sub.add_parser("chase", help="top-down chase steering: shared flow field vs per-worker A*")
+    p.add_argument("--workers", default="10,50,200")
+    p.add_argument("--ticks", type=int, default=300)
+    p = sub.add_parser("store", help="runner obstacle/coin store: objects vs NumPy arrays")
+    p.add_argument("--counts", default="10,100,1000")
+    p.add_argument("--ticks", type=int, default=600)
+    p = sub.add_parser("collide", help="runner hit tests at extreme speeds and tick lengths (exit 1 if anything tunnels)")
+    p.add_argument("--seeds", type=int, default=20)
+    p = sub.add_parser("alloc", help="assert no allocation growth over a long runner session (exit 1 on failure)")
+    p.add_argument("--minutes", type=float, default=10.0)
+    p = sub.add_parser("save", help="main-thread latency of saving users.json")
+    p.add_argument("--users", type=int, default=1000)
+    p = sub.add_parser("login", help="login latency and frame gaps with hashing off the Tk thread")
+    p.add_argument("--iterations", default=str(Game.PBKDF2_ITERATIONS))
+    p = sub.add_parser("sound", help="sound synthesis startup and play_sound() trigger cost")
+    p.add_argument("--triggers", type=int, default=2000)
+    p = sub.add_parser("suite", help="all seeded scenarios, written as JSON for tracking between commits")
+    p.add_argument("--out", help="write results here (default: stdout)")
+    p.add_argument("--only", help="comma-separated subset of: " + ",".join(SCENARIOS))
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--compare", metavar="OLD_JSON", help="diff against an earlier run; exit 1 on a regression")
+    p.add_argument("--threshold", type=float, default=20.0, help="percent slowdown that counts as a regression")
+    p = sub.add_parser("chunks", help="runner chunk build cost and a solvability search over seeded roads (exit 1 if stuck)")
+    p.add_argument("--seeds", type=int, default=100)
+    p.add_argument("--minutes", type=float, default=3.0)
+    p = sub.add_parser("record", help="record a scripted-bot run as an input log")
+    p.add_argument("out")
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("replay", help="replay an input log headless: per-tick cost and a determinism check (exit 1 on mismatch)")
+    p.add_argument("log")
+    p.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+    if args.cmd == "startup":
+        report_startup(bench_startup(args.runs))
+    elif args.cmd == "sim":
+        r = bench_sim(args.runs, args.seed, args.numpy)
+        print(f"{r['runs']} runs in {r['seconds']:.2f}s: {r['runs_per_s']:.0f} runs/s, "
+              f"{r['ticks_per_s']:.0f} ticks/s, {r['mean_ticks']:.0f} ticks/run, median score {r['median_score']}, "
+              f"{r['timeouts']} hit the tick limit")
+    elif args.cmd == "topdown":
+        counts = [int(n) for n in args.workers.split(",")]
+        for n, us in bench_topdown(counts, args.ticks).items():
+            print(f"{n:>5} workers: {us:8.1f} us/tick ({us / (Game.TICK * 1e6) * 100:.1f}% of a frame)")
+    elif args.cmd == "world":
+        for name, r in bench_world(ticks=args.ticks).items():
+            print(f"{name:>9} {r['size'][0]}x{r['size'][1]}: {r['tick_us']:6.1f} us/tick, cull query {r['cull_us']:5.1f} us, "
+                  f"{r['visible']:.1f} of {r['entities']} workers+vans in view")
+    elif args.cmd == "chase":
+        for n, r in bench_chase([int(n) for n in args.workers.split(",")], args.ticks).items():
+            print(f"{n:>5} chasers: flow field {r['flow_us']:8.1f} us/tick ({r['field_builds']} field builds), "
+                  f"A* per chaser {r['astar_us']:9.1f} us/tick")
+    elif args.cmd == "store":
+        counts = [int(n) for n in args.counts.split(",")]
+        print(f"{'live':>6} {'list us/tick':>13} {'numpy us/tick':>14}")
+        for n, r in bench_store(counts, args.ticks).items():
+            np_us = f"{r['numpy_us']:14.1f}" if "numpy_us" in r else f"{'n/a':>14}"
+            print(f"{n:>6} {r['list_us']:13.1f} {np_us}")
+    elif args.cmd == "save":
+        r = bench_save(args.users)
+        print(f"{r['users']} accounts, main-thread cost per save: blocking indent=2 {r['blocking_indent_ms']:.2f} ms, "
+              f"blocking atomic {r['blocking_atomic_ms']:.2f} ms, SaveWorker p50 {r['async_p50_ms']:.3f} ms (max {r['async_max_ms']:.3f} ms)")
+        print(f"{r['requests']} save requests coalesced into {r['writes']} writes, file up to date: {r['file_ok']}")
+        print(f"SQLite store: get {r['sqlite_get_ms']:.3f} ms, put (one-row upsert) {r['sqlite_put_ms']:.3f} ms")
+    elif args.cmd == "login":
+        for n in [int(n) for n in args.iterations.split(",")]:
+            r = bench_login(n)
+            print(f"{n:>8} iterations: blocking verify {r['blocking_ms']:.1f} ms frozen; off-thread login {r['async_ms']:.1f} ms "
+                  f"with worst frame gap {r['max_gap_ms']:.1f} ms over {r['frames']} frames, verified: {r['ok']}")
+    elif args.cmd == "sound":
+        r = bench_sound(args.triggers)
+        print(f"synthesising all effects: per-sample struct.pack WAV {r['old_synth_ms']:.2f} ms, "
+              f"synth_tone {r['synth_ms']:.2f} ms ({r['synth_pure_ms']:.2f} ms without NumPy)")
+        print(f"mixer: {r['mixer']}; SoundBank build {r['bank_build_ms']:.2f} ms, play_sound {r['play_us']:.2f} us/trigger")
+        print(f"12-coin burst: {r['burst_played']} played, {r['burst_throttled']} throttled")
+    elif args.cmd == "suite":
+        res = run_suite(args.only.split(",") if args.only else None, args.seed)
+        text = json.dumps(res, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf8") as f: f.write(text + "\n")
+        else:
+            print(text)
+        if args.compare:
+            with open(args.compare, encoding="utf8") as f: old = json.load(f)
+            sys.exit(1 if compare(old, res, args.threshold) else 0)
+    elif args.cmd == "chunks":
+        r = bench_chunks(args.seeds, args.minutes)
+        print(f"build_chunk: {r['build_us']:.1f} us per {Game.CHUNK_LEN}px chunk, {r['entries_per_chunk']:.1f} entries")
+        print(f"{r['seeds']} seeds x {r['minutes']:g} min of road: " +
+              ("every road survivable" if not r["unsolvable"] else f"STUCK on {len(r['unsolvable'])}: {r['unsolvable']}"))
+        sys.exit(1 if r["unsolvable"] else 0)
+    elif args.cmd == "record":
+        path, sim = record_bot(args.out, args.seed)
+        print(f"{path}: seed {sim.seed}, {sim.ticks} ticks, {len(sim.input.events)} input changes, result {sim.result}")
+    elif args.cmd == "replay":
+        r = bench_replay(args.log, args.repeat)
+        print(f"{r['ticks']} ticks x {r['calls'] // max(1, r['ticks'])}: p50 {r['p50_us']:.1f} us/tick, p95 {r['p95_us']:.1f} us, "
+              f"max {r['max_us']:.1f} us; {r['speedup']:.0f}x real time")
+        if r["recorded_frames"]:
+            f = r["recorded_frames"]
+            print(f"recorded session: p50 {f['p50_ms']:.1f} ms, p95 {f['p95_ms']:.1f} ms, p99 {f['p99_ms']:.1f} ms frames, "
+                  f"{f['missed']} missed deadlines")
+        print("deterministic: result matches the recording" if r["deterministic"] else "MISMATCH: replay diverged from the recording")
+        sys.exit(0 if r["deterministic"] else 1)
+    elif args.cmd == "collide":
+        ok, rows = check_collide(seeds=args.seeds)
+        print(f"{'store':<6} {'speed px/s':>10} {'dt ms':>6} {'crashes':>8} {'tunnelled':>10} {'point test missed':>18}")
+        for r in rows:
+            print(f"{r['store']:<6} {r['speed']:>10} {r['dt'] * 1000:>6.1f} {r['crashes']:>8} {r['tunnelled']:>10} "
+                  f"{r['point_test_missed']:>18}")
+        print("OK" if ok else f"FAIL: every run must crash ({args.seeds}) with nothing tunnelled")
+        sys.exit(0 if ok else 1)
+    elif args.cmd == "alloc":
+        ok, r = check_alloc(args.minutes)
+        print(f"{r['sim_minutes']:g} simulated minutes: {r['growth_kb']:+.1f} KiB traced growth, "
+              f"{r['entities_created']} entities constructed after warm-up ({r['live']} live, {r['pooled']} pooled)")
+        print("OK" if ok else "FAIL: allocations grew")
+        sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()